@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import contextlib
+import functools
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+from typing import Any
+
+import pandas as pd
+from loguru import logger
+
+from importer.configuration.inject import ConfigValue
+
+from .metadata import Metadata
+
+MANIFEST_FILENAME: str = "manifest.json"
+
+# Modules whose code determines the post-policy data tables
+LOADER_MODULES: tuple[str, ...] = ("importer.submission", "importer.policies", "importer.utility", "importer.metadata")
+
+
+def hash_file(filename: str, chunk_size: int = 1 << 20) -> str:
+    """Returns the SHA-256 digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(filename, "rb") as fp:
+        while chunk := fp.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_config(data: Any) -> str:
+    """Returns the SHA-256 digest of a (JSON serializable) configuration value."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def hash_data_frame(data: pd.DataFrame | None) -> str | None:
+    """Returns a digest of a data frame's content, column names and dtypes, or None if content isn't hashable."""
+    if data is None:
+        return "none"
+    try:
+        digest = hashlib.sha256()
+        digest.update(json.dumps([[str(k), str(v)] for k, v in data.dtypes.items()]).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+        return digest.hexdigest()
+    except Exception:  # pylint: disable=broad-except
+        return None
+
+
+@functools.cache
+def loader_version() -> str:
+    """Returns a digest of the source code of the modules that load the submission and apply the policies."""
+    digest = hashlib.sha256()
+    for module_name in LOADER_MODULES:
+        digest.update(inspect.getsource(importlib.import_module(module_name)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def write_atomic(filename: str, text: str) -> None:
+    """Writes text to a temporary file in the target folder and then moves it in place."""
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    fd, temp_filename = tempfile.mkstemp(dir=os.path.dirname(filename), prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fp:
+            fp.write(text)
+        os.replace(temp_filename, filename)
+    except:  # pylint: disable=bare-except
+        with contextlib.suppress(OSError):
+            os.remove(temp_filename)
+        raise
+
+
+class SubmissionCache:
+    """Stores post-policy data tables on disk, keyed by workbook content, policies config, metadata fingerprint and
+    the version (source code) of the loader and policies.
+    Each cache entry is a folder containing one pickled data frame per table and a manifest of the table order."""
+
+    def __init__(self, folder: str, metadata: Metadata) -> None:
+        self.folder: str = folder
+        self.metadata: Metadata = metadata
+
+    def key(self, source: str) -> str:
+        policies: dict = ConfigValue("policies").resolve() or {}
+        parts: list[str] = [hash_file(source), hash_config(policies), self.metadata.fingerprint, loader_version()]
+        return hashlib.sha256(":".join(parts).encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.folder, key)
+
+    def load(self, key: str) -> dict[str, pd.DataFrame] | None:
+        """Returns cached data tables, or None if the key isn't cached."""
+        manifest_filename: str = os.path.join(self.path(key), MANIFEST_FILENAME)
+        if not os.path.isfile(manifest_filename):
+            return None
+        try:
+            with open(manifest_filename, "r", encoding="utf-8") as fp:
+                table_names: list[str] = json.load(fp)["tables"]
+            return {
+                table_name: pd.read_pickle(os.path.join(self.path(key), f"{table_name}.pkl"))
+                for table_name in table_names
+            }
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning(f"ignoring unreadable submission cache entry {key}: {ex}")
+            return None
+
+    def store(self, key: str, data_tables: dict[str, pd.DataFrame]) -> None:
+        """Stores data tables in the cache. The entry is written to a temporary folder and then moved in place."""
+        os.makedirs(self.folder, exist_ok=True)
+        staging_folder: str = tempfile.mkdtemp(dir=self.folder, prefix=".tmp_")
+        try:
+            for table_name, data in data_tables.items():
+                data.to_pickle(os.path.join(staging_folder, f"{table_name}.pkl"))
+            with open(os.path.join(staging_folder, MANIFEST_FILENAME), "w", encoding="utf-8") as fp:
+                json.dump({"tables": list(data_tables.keys())}, fp)
+            if os.path.isdir(self.path(key)):
+                shutil.rmtree(self.path(key))
+            os.replace(staging_folder, self.path(key))
+        except:  # pylint: disable=bare-except
+            shutil.rmtree(staging_folder, ignore_errors=True)
+            raise
+
+
+class SpecificationCache:
+    """Stores specification messages on disk as one JSON file per key."""
+
+    def __init__(self, folder: str) -> None:
+        self.folder: str = os.path.join(folder, "specifications")
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.folder, key[:2], f"{key}.json")
+
+    def load(self, key: str) -> dict[str, list[str]] | None:
+        """Returns cached messages, or None if the key isn't cached."""
+        if not os.path.isfile(self.path(key)):
+            return None
+        try:
+            with open(self.path(key), "r", encoding="utf-8") as fp:
+                return json.load(fp)
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning(f"ignoring unreadable specification cache entry {key}: {ex}")
+            return None
+
+    def store(self, key: str, messages: dict[str, list[str]]) -> None:
+        write_atomic(self.path(key), json.dumps(messages))
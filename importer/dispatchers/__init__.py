@@ -6,6 +6,9 @@ from ..submission import Submission
 
 class IDispatcher(abc.ABC):
 
+    indented: bool = False
+    """True if the output is already indented with one element per line (i.e. formatting it is a no-op)"""
+
     def dispatch(
         self,
         metadata: Metadata,
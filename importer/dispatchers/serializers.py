@@ -0,0 +1,142 @@
+"""
+Serializer backends of the XML dispatcher. A serializer escapes the values that are inserted in the rendered markup,
+and writes the markup to the output stream in blocks. All backends produce identical output.
+"""
+
+import abc
+import os
+from typing import IO, Any
+
+from loguru import logger
+
+from ..utility import XML_TEXT_SPECIALS, Registry, escape_text
+
+DEFAULT_BUFFER_SIZE: int = 4 * 1024 * 1024
+
+# Joins values that are escaped in a single call (a private use character, unaffected by escaping)
+SEPARATOR: str = "\ue000"
+
+
+def escape_values(values: list[str]) -> list[str]:
+    """Escapes values to be used as element content. All values are escaped at once, joined by SEPARATOR,
+    unless a value contains the separator."""
+    text: str = SEPARATOR.join(values)
+    if not XML_TEXT_SPECIALS.search(text):
+        return values
+    if text.count(SEPARATOR) != len(values) - 1:
+        return [escape_text(x) for x in values]
+    return escape_text(text).split(SEPARATOR)
+
+
+class SerializerRegistry(Registry):
+    items: dict = {}
+
+
+Serializers: SerializerRegistry = SerializerRegistry()
+
+
+class XmlSerializer(abc.ABC):
+    """Collects rendered markup and writes it to `outstream` in blocks of at least `block_size` characters, which
+    saves the per-call overhead of the I/O layer. Remaining markup is written by `flush`."""
+
+    key: str = None
+
+    def __init__(self, outstream: IO, block_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        self.outstream: IO = outstream
+        self.block_size: int = block_size
+        self.parts: list[str] = []
+        self.size: int = 0
+
+    def write(self, text: str) -> None:
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.block_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.parts:
+            self.write_block("".join(self.parts))
+            self.parts = []
+            self.size = 0
+
+    @abc.abstractmethod
+    def write_block(self, text: str) -> None: ...
+
+    def escape_values(self, values: list[str]) -> list[str]:
+        """Escapes values to be used as element content."""
+        return escape_values(values)
+
+
+@Serializers.register(key="string")
+class StringSerializer(XmlSerializer):
+    """Writes markup as text to the (text) output stream."""
+
+    key: str = "string"
+
+    def write_block(self, text: str) -> None:
+        self.outstream.write(text)
+
+
+@Serializers.register(key="bytes")
+class BytesSerializer(XmlSerializer):
+    """Encodes markup as UTF-8 and writes it directly to the binary buffer of a text stream, bypassing the encoder and
+    newline translation of the text layer. Falls back to text if the stream has no buffer, isn't UTF-8 encoded,
+    or if newlines would be translated."""
+
+    key: str = "bytes"
+
+    def __init__(self, outstream: IO, block_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        super().__init__(outstream, block_size)
+        self.buffer: IO | None = self.get_buffer(outstream)
+
+    @staticmethod
+    def get_buffer(outstream: IO) -> IO | None:
+        buffer: IO | None = getattr(outstream, "buffer", None)
+        encoding: str = (getattr(outstream, "encoding", None) or "").lower().replace("-", "")
+        if buffer is None or encoding != "utf8" or os.linesep != "\n":
+            return None
+        return buffer
+
+    def write_block(self, text: str) -> None:
+        if self.buffer is None:
+            self.outstream.write(text)
+            return
+        self.outstream.flush()  # text written to the stream by others must come first
+        self.buffer.write(text.encode("utf-8"))
+
+
+@Serializers.register(key="lxml")
+class LxmlSerializer(BytesSerializer):
+    """Escapes values with lxml (libxml2), all values of a column in a single call, and writes markup as bytes.
+    Values lxml doesn't accept (i.e. with characters not allowed in XML) are escaped one by one."""
+
+    key: str = "lxml"
+
+    def __init__(self, outstream: IO, block_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        super().__init__(outstream, block_size)
+        from lxml import etree  # pylint: disable=import-outside-toplevel
+
+        self.element: Any = etree.Element("v")
+        self.tostring = etree.tostring
+
+    def escape_values(self, values: list[str]) -> list[str]:
+        text: str = SEPARATOR.join(values)
+        if not text or text.count(SEPARATOR) != len(values) - 1:
+            return super().escape_values(values)
+        try:
+            self.element.text = text
+            escaped: str = self.tostring(self.element, encoding=str)
+        except (ValueError, UnicodeError):
+            return super().escape_values(values)
+        finally:
+            self.element.text = None
+        return escaped[3:-4].split(SEPARATOR)
+
+
+def create_serializer(key: str | None, outstream: IO, block_size: int = DEFAULT_BUFFER_SIZE) -> XmlSerializer:
+    """Returns serializer `key` (default "string"). Falls back to the string serializer if lxml isn't installed."""
+    try:
+        return Serializers.get(key or StringSerializer.key)(outstream, block_size)
+    except ImportError as ex:
+        logger.warning(f"serializer {key} not available ({ex}), using {StringSerializer.key}")
+        return StringSerializer(outstream, block_size)
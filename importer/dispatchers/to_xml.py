@@ -1,15 +1,19 @@
 import contextlib
 import logging
-from typing import Any
-from xml.sax.saxutils import escape
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Callable
 
+import numpy as np
 import pandas as pd
 from jinja2 import Environment, select_autoescape
 from loguru import logger
 
 from ..metadata import Column, Metadata, Table
 from ..submission import Submission
+from ..utility import ColumnMatcher, column_matcher, escape_attribute
 from . import IDispatcher
+from .serializers import DEFAULT_BUFFER_SIZE, XmlSerializer, create_serializer, escape_values
 
 # pylint: disable=too-many-nested-blocks, too-many-statements
 
@@ -21,6 +25,9 @@ LOOKUP_TEMPLATE: str = """
 """
 
 
+INDENTS: list[str] = ["  " * indent for indent in range(8)]
+
+
 def _to_int_or_none(value: Any) -> int | None:
     with contextlib.suppress(Exception):
         if value is None or pd.isna(value):
@@ -29,11 +36,110 @@ def _to_int_or_none(value: Any) -> int | None:
     return value
 
 
-def _to_none(value: Any) -> int | None:
+def _is_number_dtype(dtype: Any) -> bool:
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def _to_int_or_none_values(values: pd.Series) -> pd.Series:
+    """Vectorized `_to_int_or_none`: integral values as Int64 (missing values are NA), else an object series."""
     with contextlib.suppress(Exception):
-        if value is None or pd.isna(value):
-            return None
-    return value
+        if _is_number_dtype(values.dtype) and pd.api.types.is_integer_dtype(values.dtype):
+            return values.astype("Int64")
+        if pd.api.types.is_float_dtype(values.dtype) and np.isfinite(values.dropna().to_numpy(dtype=float)).all():
+            return pd.Series(np.trunc(values.to_numpy(dtype=float, na_value=np.nan)), index=values.index).astype(
+                "Int64"
+            )
+    return pd.Series([_to_int_or_none(x) for x in values.tolist()], index=values.index, dtype=object)
+
+
+def _to_strings(values: pd.Series) -> np.ndarray:
+    """Formats (non-missing) values as `str` would do with the values of `DataFrame.to_dict(orient="records")`."""
+    if _is_number_dtype(values.dtype) and pd.api.types.is_integer_dtype(values.dtype):
+        return values.astype(str).to_numpy(dtype=object)
+    if pd.api.types.is_float_dtype(values.dtype):
+        return values.to_numpy(dtype=float, na_value=np.nan).astype(str).astype(object)
+    return np.array([str(x) for x in values.tolist()], dtype=object)
+
+
+def _to_xml_values(values: pd.Series, escape_fn: Callable[[list[str]], list[str]] = escape_values) -> np.ndarray:
+    """Formats the values of a non-key column as XML element content. Missing values are emitted as NULL."""
+    is_missing: np.ndarray = values.isna().to_numpy(dtype=bool)
+    if _is_number_dtype(values.dtype):
+        strings: np.ndarray = _to_strings(values)
+    else:
+        strings = np.array(escape_fn([x if isinstance(x, str) else str(x) for x in values.tolist()]), dtype=object)
+    strings[is_missing] = "NULL"
+    return strings
+
+
+@dataclass
+class ColumnPlan:
+    """How a column is emitted. For FK columns, `fk_map` maps referenced system ids to public ids (None if the
+    referenced table isn't in the submission), and unresolvable FKs only emit missing (NULL) values."""
+
+    column: Column
+    tag: str
+    fk_map: pd.Series | None = None
+    fk_is_resolvable: bool = True
+
+    @property
+    def is_fk(self) -> bool:
+        return self.column.is_fk
+
+    @cached_property
+    def fk_class_name(self) -> str:
+        return self.column.class_name.split(".")[-1]
+
+    def render(
+        self, data: pd.DataFrame, system_ids: np.ndarray, escape_fn: Callable[[list[str]], list[str]] = escape_values
+    ) -> np.ndarray:
+        """Returns the column's XML fragment (a line or an empty string) for each row in `data`."""
+        if self.column.is_pk:
+            return f'      <{self.tag} class="{self.column.class_name}">' + system_ids + f"</{self.tag}>\n"
+        if not self.is_fk:
+            values: np.ndarray = _to_xml_values(data[self.column.column_name], escape_fn)
+            return f'      <{self.tag} class="{self.column.class_name}">' + values + f"</{self.tag}>\n"
+        return self.render_fk(data)
+
+    def render_fk(self, data: pd.DataFrame) -> np.ndarray:
+        """The value is a FK system_id"""
+        fk_system_ids: pd.Series = _to_int_or_none_values(data[self.column.column_name])
+        has_value: np.ndarray = fk_system_ids.notna().to_numpy(dtype=bool)
+        null_fragment: str = f'      <{self.tag} class="com.sead.database.{self.column.class_name}" id="NULL"/>\n'
+        fragments: np.ndarray = np.full(len(data), null_fragment, dtype=object)
+        if not self.fk_is_resolvable:
+            fragments[has_value] = ""
+            return fragments
+
+        fk_system_ids = fk_system_ids[has_value]
+        system_id_strings: np.ndarray = _to_strings(fk_system_ids)
+
+        # Public id defaults to the system id if it isn't found in the referenced table
+        public_id_strings: np.ndarray = system_id_strings.copy()
+        has_public_id: np.ndarray = np.ones(len(fk_system_ids), dtype=bool)
+        if self.fk_map is not None and len(self.fk_map) > 0:
+            positions: np.ndarray = self.fk_map.index.get_indexer(fk_system_ids.to_numpy(dtype=object))
+            is_found: np.ndarray = positions >= 0
+            fk_public_ids: pd.Series = _to_int_or_none_values(self.fk_map.iloc[positions[is_found]])
+            has_public_id[is_found] = fk_public_ids.notna().to_numpy(dtype=bool)
+            public_id_strings[is_found] = _to_strings(fk_public_ids)
+
+        prefix: str = f'      <{self.tag} class="com.sead.database.{self.fk_class_name}" id="'
+        fragments[has_value] = np.where(
+            has_public_id,
+            prefix + system_id_strings + '" clonedId="' + public_id_strings + '"/>\n',
+            prefix + system_id_strings + '"/>\n',
+        )
+        return fragments
+
+
+@dataclass
+class TablePlan:
+    """Everything needed to emit a table's rows that doesn't depend on the row itself."""
+
+    table: Table
+    columns: list[ColumnPlan]
+    has_date_updated: bool
 
 
 class XmlProcessor(IDispatcher):
@@ -42,22 +148,100 @@ class XmlProcessor(IDispatcher):
     The format of the XML-file is conforms to clearinghouse specifications
     """
 
-    def __init__(self, outstream, level: int = logging.WARNING, ignore_columns: list[str] = None) -> None:
+    chunk_size: int = 50000
+    indented: bool = True
+
+    def __init__(
+        self,
+        outstream,
+        level: int = logging.WARNING,
+        ignore_columns: list[str] = None,
+        *,
+        buffer_size: int = None,
+        serializer: str = None,
+    ) -> None:
         self.outstream = outstream
+        self.writer: XmlSerializer = create_serializer(
+            serializer, outstream, DEFAULT_BUFFER_SIZE if buffer_size is None else buffer_size
+        )
         self.level: int = level
         self.ignore_columns: list[str] = ignore_columns or ["date_updated"]
+        self.ignore_matcher: ColumnMatcher = column_matcher(self.ignore_columns)
         self.jinja_env = Environment(autoescape=select_autoescape(["xml"]))
+        self.fk_maps: dict[tuple[str, str], pd.Series] = {}
 
     def emit(self, data: str, indent: int = 0) -> None:
-        self.outstream.write("{}{}\n".format("  " * indent, data))
+        self.writer.write(f"{INDENTS[indent]}{data}\n")
+
+    def flush(self) -> None:
+        self.writer.flush()
 
     def emit_tag(self, tag: str, attributes: dict[str, Any] = None, indent=0, close=True) -> None:
-        attrib_str: str = " ".join(['{}="{}"'.format(x, y) for (x, y) in (attributes or {}).items()])
+        attrib_str: str = " ".join(f'{x}="{escape_attribute(str(y))}"' for (x, y) in (attributes or {}).items())
         self.emit(f"<{tag} {attrib_str}{'/' if close else ''}>", indent)
 
     def emit_close_tag(self, tag: str, indent: int) -> None:
         self.emit(f"</{tag}>", indent)
 
+    def compile_plan(self, metadata: Metadata, submission: Submission, table: Table, data: pd.DataFrame) -> TablePlan:
+        """Resolves everything that is the same for all rows in a table: which columns to emit, their tags and classes,
+        and for FK columns the referenced table's system_id => public id map."""
+        columns: list[ColumnPlan] = []
+        for column_name, column_spec in table.columns.items():
+            if self.ignore_matcher.match(column_name):
+                continue
+
+            if column_name not in data.columns:
+                if not column_spec.is_nullable or column_name.endswith("_uuid"):
+                    logger.warning(
+                        f"Table {table.table_name}, (not nullable) column {column_name} not found in submission "
+                    )
+                continue
+
+            if not column_spec.is_fk:
+                columns.append(ColumnPlan(column=column_spec, tag=column_spec.camel_case_column_name))
+                continue
+
+            fk_table_spec: Table = metadata[column_spec.class_name]
+            if fk_table_spec.table_name is None:
+                logger.warning(
+                    f"Table {column_spec.table_name}, FK column {column_name}: "
+                    f"unable to resolve FK class {column_spec.class_name}"
+                )
+                continue
+
+            fk_data_table: pd.DataFrame = submission.data_tables.get(fk_table_spec.table_name)
+            fk_map: pd.Series | None = None
+            if fk_data_table is not None:
+                if column_name in fk_data_table.columns:
+                    fk_map = self.get_fk_map(fk_table_spec.table_name, column_name, fk_data_table)
+                else:
+                    logger.warning(
+                        f"Table {column_spec.table_name}, FK column {column_name}: "
+                        f"FK column not found in {fk_table_spec.table_name}"
+                    )
+            columns.append(
+                ColumnPlan(
+                    column=column_spec,
+                    tag=column_spec.camel_case_column_name,
+                    fk_map=fk_map,
+                    fk_is_resolvable=fk_data_table is None or fk_map is not None,
+                )
+            )
+
+        return TablePlan(table=table, columns=columns, has_date_updated="date_updated" in table.columns)
+
+    def get_fk_map(self, fk_table_name: str, column_name: str, fk_data_table: pd.DataFrame) -> pd.Series:
+        """Returns the public ids (`column_name`) of the referenced table indexed by system_id, created once per
+        dispatch. System ids that occur more than once are left out, since they don't resolve to a single public id."""
+        key: tuple[str, str] = (fk_table_name, column_name)
+        if key not in self.fk_maps:
+            is_single: np.ndarray = ~fk_data_table.system_id.duplicated(keep=False).to_numpy(dtype=bool)
+            self.fk_maps[key] = fk_data_table[column_name][is_single].set_axis(
+                pd.Index(fk_data_table.system_id.to_numpy(dtype=object)[is_single])
+            )
+        return self.fk_maps[key]
+
     def process_tables(
         self, metadata: Metadata, submission: Submission, table_names: list[str], max_rows: int = 0
     ) -> None:
@@ -66,6 +250,7 @@ class XmlProcessor(IDispatcher):
         All submission tables MUST have a non null "system_id"
         All submission tables MUST have a PK column with a name equal to that specified in "Tables" meta-data PK-name field
         """
+        self.fk_maps = {}
         for table_name in sorted(table_names):
             logger.debug(f"Processing {table_name}...")
 
@@ -86,60 +271,13 @@ class XmlProcessor(IDispatcher):
 
             self.emit(f'<{table.java_class} length="{data.shape[0]}">', 1)
 
-            for record in data.to_dict(orient='records'):
+            plan: TablePlan | None = None
+            for offset in range(0, len(data), self.chunk_size):
                 try:
-                    data_row: dict = record  # record.to_dict()
-
-                    public_id: int | None = _to_int_or_none(
-                        data_row[table.pk_name] if table.pk_name in data_row else None
-                    )
-                    system_id: int | None = _to_int_or_none(data_row["system_id"])
-
-                    if public_id is None and system_id is None:
-                        logger.warning(f"Table {table_name}: Skipping row since both CloneId and SystemID is NULL")
-                        continue
-
-                    if system_id is None:
-                        system_id = public_id
-
-                    referenced_keyset.discard(system_id)
-
-                    assert not (public_id is None and system_id is None)
-
-                    if public_id is not None:
-                        self.emit(f'<{table_namespace} id="{system_id}" clonedId="{public_id}"/>', 2)
-                        continue
-
-                    self.emit(f'<{table_namespace} id="{system_id}">', 2)
-
-                    for column_name, column_spec in table.columns.items():
-                        if column_name in self.ignore_columns:
-                            continue
-
-                        if column_name not in data_row.keys():
-                            if not column_spec.is_nullable or column_name.endswith("_uuid"):
-                                logger.warning(
-                                    f"Table {table_name}, (not nullable) column {column_name} not found in submission "
-                                )
-                            continue
-
-                        if not column_spec.is_fk:
-                            self.process_pk_and_non_fk(data_row, public_id, system_id, column_spec)
-                        else:
-                            fk_table_spec: str = metadata[column_spec.class_name]
-                            fk_data_table: pd.DataFrame = submission.data_tables.get(fk_table_spec.table_name)
-                            self.process_fk(data_row, column_spec, fk_table_spec, fk_data_table)
-
-                    # ClonedId tag is always emitted (NULL id missing)
-                    self.emit(
-                        f'<clonedId class="java.util.Integer">{"NULL" if public_id is None else public_id}</clonedId>',
-                        3,
-                    )
-                    if "date_updated" in table.column_names():
-                        self.emit('<dateUpdated class="java.util.Date"/>', 3)
-
-                    self.emit(f"</{table_namespace}>", 2)
-
+                    chunk: pd.DataFrame = data.iloc[offset : offset + self.chunk_size]
+                    if plan is None and self.has_new_rows(table, chunk):
+                        plan = self.compile_plan(metadata, submission, table, data)
+                    self.writer.write(self.render_rows(table, plan, chunk, referenced_keyset))
                 except Exception as x:
                     logger.error(f"CRITICAL FAILURE: Table {table_name} {x}")
                     raise
@@ -149,68 +287,61 @@ class XmlProcessor(IDispatcher):
                     f"Warning: {table_name} has {len(referenced_keyset)} referenced keys not found in submission"
                 )
                 for key in referenced_keyset:
-                    self.emit(f'<com.sead.database.{table.java_class} id="{int(key)}" clonedId="{int(key)}"/>', 2)
+                    self.emit(f'<{table_namespace} id="{int(key)}" clonedId="{int(key)}"/>', 2)
             self.emit(f"</{table.java_class}>", 1)
 
-    def process_fk(self, data_row: dict, column: Column, fk_table_spec: Table, fk_data_table: pd.DataFrame) -> None:
-        """The value is a FK system_id"""
-        class_name: str = column.class_name
-        camel_case_column_name: str = column.camel_case_column_name
+    def get_public_ids(self, table: Table, data: pd.DataFrame) -> pd.Series:
+        if table.pk_name not in data.columns:
+            return pd.Series(pd.NA, index=data.index, dtype="Int64")
+        return _to_int_or_none_values(data[table.pk_name])
+
+    def has_new_rows(self, table: Table, data: pd.DataFrame) -> bool:
+        return bool(self.get_public_ids(table, data).isna().any())
+
+    def render_rows(self, table: Table, plan: TablePlan | None, data: pd.DataFrame, referenced_keyset: set) -> str:
+        """Returns the XML of the rows in `data`. Each column is rendered for all rows at once, and the column fragments
+        are then joined row-wise. Existing rows (with a public id) are emitted as a single reference element."""
+        table_namespace: str = f"com.sead.database.{table.java_class}"
+        public_ids: pd.Series = self.get_public_ids(table, data)
+        system_ids: pd.Series = _to_int_or_none_values(data["system_id"])
 
-        if fk_table_spec.table_name is None:
+        has_public_id: np.ndarray = public_ids.notna().to_numpy(dtype=bool)
+        has_system_id: np.ndarray = system_ids.notna().to_numpy(dtype=bool)
+        is_skipped: np.ndarray = ~has_public_id & ~has_system_id
+        is_new: np.ndarray = ~has_public_id & has_system_id
+
+        if is_skipped.any():
             logger.warning(
-                f"Table {column.table_name}, FK column {column.column_name}: unable to resolve FK class {class_name}"
+                f"Table {table.table_name}: Skipping {is_skipped.sum()} row(s) since both CloneId and SystemID is NULL"
             )
-            return
-
-        fk_system_id: int | None = _to_int_or_none(data_row[column.column_name])
-        if fk_system_id is None:
-            self.emit(f'<{camel_case_column_name} class="com.sead.database.{class_name}" id="NULL"/>', 3)
-            return
-
-        fk_public_id: int | None = None
-        if fk_data_table is None:
-            fk_public_id = fk_system_id
-        else:
-            if column.column_name not in fk_data_table.columns:
-                logger.warning(
-                    f"Table {column.table_name}, FK column {column.column_name}: FK column not found in {fk_table_spec.table_name}, id={fk_system_id}"
-                )
-                return
-            fk_data_row: pd.DataFrame = fk_data_table.loc[(fk_data_table.system_id == fk_system_id)]
-            if fk_data_row.empty or len(fk_data_row) != 1:
-                fk_public_id = fk_system_id
-            else:
-                fk_public_id = _to_int_or_none(fk_data_row[column.column_name].iloc[0])
-
-        class_name = class_name.split(".")[-1]
-
-        if fk_public_id is None:
-            self.emit(f'<{camel_case_column_name} class="com.sead.database.{class_name}" id="{fk_system_id}"/>', 3)
-        else:
-            self.emit(
-                f'<{camel_case_column_name} class="com.sead.database.{class_name}" id="{int(fk_system_id)}" clonedId="{int(fk_public_id)}"/>',
-                3,
+
+        system_ids = system_ids.astype(object).where(has_system_id, public_ids.astype(object))
+        referenced_keyset.difference_update(system_ids[~is_skipped].tolist())
+
+        rows: np.ndarray = np.full(len(data), "", dtype=object)
+
+        if has_public_id.any():
+            rows[has_public_id] = (
+                f'    <{table_namespace} id="'
+                + _to_strings(system_ids[has_public_id])
+                + '" clonedId="'
+                + _to_strings(public_ids[has_public_id])
+                + '"/>\n'
             )
 
-    def process_pk_and_non_fk(self, data_row: dict, public_id: int | None, system_id: int | None, column: Column):
-        """The value is a PK or non-FK attribte"""
-        value: Any = data_row[column.column_name]
-
-        if column.is_pk:
-            value = int(public_id) if public_id is not None else system_id
-        elif _to_none(value) is None:
-            value = "NULL"
-        else:
-            if isinstance(value, str) and any((c in "<>&") for c in value):
-                value: str = escape(value)
-
-        self.emit(
-            f'<{column.camel_case_column_name} class="{column.class_name}">{value}</{column.camel_case_column_name}>',
-            3,
-        )
+        if is_new.any():
+            new_data: pd.DataFrame = data[is_new]
+            new_system_ids: np.ndarray = _to_strings(system_ids[is_new])
+            fragments: np.ndarray = f'    <{table_namespace} id="' + new_system_ids + '">\n'
+            for column_plan in plan.columns:
+                fragments = fragments + column_plan.render(new_data, new_system_ids, self.writer.escape_values)
+            # ClonedId tag is always emitted (NULL id missing)
+            closing: str = '      <clonedId class="java.util.Integer">NULL</clonedId>\n'
+            if plan.has_date_updated:
+                closing += '      <dateUpdated class="java.util.Date"/>\n'
+            rows[is_new] = fragments + closing + f"    </{table_namespace}>\n"
 
-        return value
+        return "".join(rows.tolist())
 
     def dispatch(
         self,
@@ -221,7 +352,10 @@ class XmlProcessor(IDispatcher):
     ) -> None:
         tables_to_process: list[str] = list(submission.data_tables.keys()) if table_names is None else table_names
 
-        self.emit('<?xml version="1.0" ?>')
-        self.emit("<sead-data-upload>")
-        self.process_tables(metadata, submission, tables_to_process)
-        self.emit("</sead-data-upload>")
+        try:
+            self.emit('<?xml version="1.0" ?>')
+            self.emit("<sead-data-upload>")
+            self.process_tables(metadata, submission, tables_to_process)
+            self.emit("</sead-data-upload>")
+        finally:
+            self.flush()
@@ -1,12 +1,14 @@
+import hashlib
+import threading
 from dataclasses import asdict, dataclass, field
 from functools import cached_property
-from typing import Any
+from typing import Any, Iterable
 
 import pandas as pd
 
 from importer.configuration.inject import ConfigValue
 
-from .utility import camel_case_name, load_sead_columns, load_sead_data
+from .utility import camel_case_name, load_dataframe_from_postgres, load_sead_columns, load_sead_data
 
 # pylint: disable=no-member
 
@@ -122,6 +124,17 @@ class SeadSchema(dict[str, Table]):
         return {t: x.excel_sheet for t, x in self.items()}
 
 
+class locked_cached_property(cached_property):  # pylint: disable=invalid-name
+    """A cached_property that is computed at most once when accessed from several threads (guarded by the instance's
+    `lock`). Since Python 3.12, cached_property itself has no lock."""
+
+    def __get__(self, instance: Any, owner: type = None) -> Any:
+        if instance is None:
+            return self
+        with instance.lock:
+            return super().__get__(instance, owner)
+
+
 class Metadata:
     """Logic related to Excel metadata file"""
 
@@ -129,19 +142,37 @@ class Metadata:
         self.db_uri: str = db_uri
         self.foreign_key_aliases: dict[str, str] = {"updated_dataset_id": "dataset_id"}
         self.ignore_columns: list[str] = ignore_columns or ConfigValue("options.ignore_columns", default=[]).resolve()
+        self.checked_keys: dict[str, set[int]] = {}
+        self.existing_keys: dict[str, set[int]] = {}
+        self.lock: threading.RLock = threading.RLock()
 
-    @cached_property
+    def __getstate__(self) -> dict[str, Any]:
+        return {k: v for k, v in self.__dict__.items() if k != "lock"}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+
+    @locked_cached_property
     def sead_tables(self) -> pd.DataFrame:
         """Returns a dataframe of tables from SEAD with attributes."""
         sql: str = "select * from clearing_house.clearinghouse_import_tables"
         return load_sead_data(self.db_uri, sql, ["table_name"])
 
-    @cached_property
+    @locked_cached_property
     def sead_columns(self) -> pd.DataFrame:
         """Returns a dataframe of table columns from SEAD with attributes."""
         return load_sead_columns(self.db_uri, self.ignore_columns)
 
-    @cached_property
+    @locked_cached_property
+    def fingerprint(self) -> str:
+        """Returns a digest of the SEAD table and column metadata."""
+        digest = hashlib.sha256()
+        for data in (self.sead_tables, self.sead_columns):
+            digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+        return digest.hexdigest()
+
+    @locked_cached_property
     def sead_dtypes(self) -> dict[str, str]:
         """Returns a dict of table to datatype mappings."""
         sql: str = (
@@ -152,7 +183,7 @@ class Metadata:
         dtypes: dict[str, str] = {k: DTYPE_MAPPING[v] for k, v in sead_types.items() if v in DTYPE_MAPPING}
         return dtypes
 
-    @cached_property
+    @locked_cached_property
     def sead_schema(self) -> SeadSchema:
         """Returns a dictionary of table attributes i.e. a row from sead_tables as a dictionary"""
 
@@ -192,7 +223,7 @@ class Metadata:
     def is_pk(self, table_name: str, column_name: str) -> bool:
         return self[table_name, column_name].is_pk
 
-    @cached_property
+    @locked_cached_property
     def foreign_keys(self) -> pd.DataFrame:
         """Returns foreign key columns from SEAD columns (performance only)."""
         return self.sead_columns[self.sead_columns.is_fk][['table_name', 'column_name', 'fk_table_name', 'class_name']]
@@ -212,3 +243,35 @@ class Metadata:
         sql: str = f"select distinct {pk_name} from {table_name}"
         keys: set = set(load_sead_data(self.db_uri, sql, index=[pk_name]).index)
         return keys
+
+    def find_primary_keys(self, keys: dict[str, Iterable[int]]) -> dict[str, set[int]]:
+        """Returns the subset of `keys` (table name => candidate PK values) that exists in SEAD.
+        All tables are checked in a single query. Checked keys are cached so that each key is only looked up once.
+        NOTE: This function assumes PK and FK names are the same."""
+        with self.lock:
+            return self._find_primary_keys(keys)
+
+    def _find_primary_keys(self, keys: dict[str, Iterable[int]]) -> dict[str, set[int]]:
+        unchecked_keys: dict[str, set[int]] = {
+            table_name: set(int(x) for x in values) - self.checked_keys.get(table_name, set())
+            for table_name, values in keys.items()
+            if self[table_name].pk_name is not None
+        }
+        unchecked_keys = {k: v for k, v in unchecked_keys.items() if v}
+
+        if unchecked_keys:
+            sql: str = "\nunion all\n".join(
+                f"select '{table_name}' as table_name, {self[table_name].pk_name} as key from {table_name} "
+                f"where {self[table_name].pk_name} = any(array[{', '.join(map(str, sorted(values)))}])"
+                for table_name, values in unchecked_keys.items()
+            )
+            found: pd.DataFrame = load_dataframe_from_postgres(sql, self.db_uri)
+            for table_name, key in found[['table_name', 'key']].itertuples(index=False):
+                self.existing_keys.setdefault(table_name, set()).add(int(key))
+            for table_name, values in unchecked_keys.items():
+                self.checked_keys.setdefault(table_name, set()).update(values)
+
+        return {
+            table_name: set(int(x) for x in values) & self.existing_keys.get(table_name, set())
+            for table_name, values in keys.items()
+        }
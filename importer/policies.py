@@ -1,7 +1,12 @@
 from __future__ import annotations
 
-from fnmatch import fnmatch
-from typing import TYPE_CHECKING
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from functools import cached_property
+from typing import TYPE_CHECKING, Any
 
 import numpy as np
 import pandas as pd
@@ -9,10 +14,10 @@ from loguru import logger
 
 from .configuration.inject import ConfigValue
 from .metadata import Metadata, SeadSchema, Table
-from .utility import Registry, pascal_to_snake_case, snake_to_pascal_case
+from .utility import Registry, column_matcher, nullable_dtype, pascal_to_snake_case, snake_to_pascal_case
 
 if TYPE_CHECKING:
-    from importer.submission import Submission
+    from importer.submission import Submission, TableProfile
 
 
 class PolicyRegistry(Registry):
@@ -29,12 +34,96 @@ class DisabledError(Exception):
     pass
 
 
+@dataclass
+class TableSnapshot:
+    """Summary of a table's state, used for computing what a policy changed (only if the policy report is requested).
+    Missing values are only counted if `count_nulls` is set, i.e. for the table a table policy visits."""
+
+    rows: int
+    dtypes: dict[str, str]
+    null_counts: dict[str, int] = field(default_factory=dict)
+    memory: int = 0
+
+    @staticmethod
+    def create(data: pd.DataFrame | None, count_nulls: bool = False) -> TableSnapshot | None:
+        if data is None:
+            return None
+        return TableSnapshot(
+            rows=len(data),
+            dtypes={str(k): str(v) for k, v in data.dtypes.items()},
+            null_counts={str(k): int(v) for k, v in data.isna().sum().items()} if count_nulls else {},
+            memory=int(data.memory_usage(index=True, deep=True).sum()),
+        )
+
+
+@dataclass
+class PolicyStatistics:
+    """What a policy did to a table. Columns are changed if their dtype or (if counted) number of missing values
+    changed. Memory delta is the change in the table's (deep) memory footprint in bytes.
+    Table name is '*' for the total elapsed time of a cross-table policy."""
+
+    policy: str
+    table_name: str
+    elapsed: float | None = None
+    rows_added: int = 0
+    rows_dropped: int = 0
+    columns_added: list[str] = field(default_factory=list)
+    columns_dropped: list[str] = field(default_factory=list)
+    columns_changed: list[str] = field(default_factory=list)
+    memory_delta: int = 0
+
+    @staticmethod
+    def create(
+        policy: str, table_name: str, elapsed: float | None, before: TableSnapshot | None, after: TableSnapshot | None
+    ) -> PolicyStatistics:
+        before = before or TableSnapshot(0, {})
+        after = after or TableSnapshot(0, {})
+        return PolicyStatistics(
+            policy=policy,
+            table_name=table_name,
+            elapsed=elapsed,
+            rows_added=max(after.rows - before.rows, 0),
+            rows_dropped=max(before.rows - after.rows, 0),
+            columns_added=[c for c in after.dtypes if c not in before.dtypes],
+            columns_dropped=[c for c in before.dtypes if c not in after.dtypes],
+            columns_changed=[
+                c
+                for c in after.dtypes
+                if c in before.dtypes
+                and (after.dtypes[c] != before.dtypes[c] or after.null_counts.get(c) != before.null_counts.get(c))
+            ],
+            memory_delta=after.memory - before.memory,
+        )
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(
+            self.rows_added
+            or self.rows_dropped
+            or self.columns_added
+            or self.columns_dropped
+            or self.columns_changed
+            or self.memory_delta
+        )
+
+
+def write_policy_report(statistics: list[PolicyStatistics], filename: str) -> None:
+    """Writes policy statistics as a JSON report."""
+    with open(filename, "w", encoding="utf-8") as fp:
+        json.dump([asdict(x) for x in statistics], fp, indent=2)
+
+
 class PolicyBase:
+    """Base class for update policies. Changes are only measured (for the policy report) if `measure` is set."""
+
+    measure: bool = False
 
     def __init__(self, metadata: Metadata, submission: Submission) -> None:
         self.metadata: Metadata = metadata
         self.submission: Submission = submission
         self.logs: dict[str, str] = {}
+        self.statistics: list[PolicyStatistics] = []
+        self.lock: threading.Lock = threading.Lock()
 
     def get_id(self) -> str:
         return pascal_to_snake_case(self.__class__.__name__)
@@ -48,10 +137,14 @@ class PolicyBase:
     def apply(self) -> None:
         if self.is_disabled():
             logger.info(f"Policy '{self.get_id()}' is disabled")
+            return
         try:
-            self.update()
-            for table, message in self.logs.items():
-                logger.info(f"{message} (policy [{snake_to_pascal_case(self.get_id())}])")
+            if self.measure:
+                self.measured_update()
+            else:
+                self.update()
+                self.submission.invalidate_profile()
+            self.log_messages()
         except:  # pylint: disable=bare-except
             logger.exception(f"Error applying policy ({snake_to_pascal_case(self.get_id())})")
             raise
@@ -59,24 +152,172 @@ class PolicyBase:
     def update(self) -> None:
         raise NotImplementedError("Policy must implement _apply method")
 
+    def snapshot(self) -> dict[str, TableSnapshot]:
+        return {table_name: TableSnapshot.create(data) for table_name, data in self.submission.data_tables.items()}
+
+    def measured_update(self) -> None:
+        """Updates the submission and records elapsed time and row and dtype changes made to each table."""
+        before: dict[str, TableSnapshot] = self.snapshot()
+        started: float = time.perf_counter()
+        self.update()
+        self.submission.invalidate_profile()
+        elapsed: float = time.perf_counter() - started
+        after: dict[str, TableSnapshot] = self.snapshot()
+
+        self.statistics.append(PolicyStatistics(policy=self.get_id(), table_name="*", elapsed=elapsed))
+        for table_name in list(before) + [x for x in after if x not in before]:
+            statistics: PolicyStatistics = PolicyStatistics.create(
+                self.get_id(), table_name, None, before.get(table_name), after.get(table_name)
+            )
+            if statistics.has_changes or table_name in self.logs:
+                self.statistics.append(statistics)
+
     def log(self, table: str, message: str = None) -> None:
-        self.logs[table] = message or self.get_id()
+        with self.lock:
+            self.logs[table] = message or self.get_id()
 
+    def order_by_tables(self, table_names: list[str]) -> None:
+        """Orders logs and statistics by table order, so that output is independent of execution order."""
+        order: dict[str, int] = {table_name: i for i, table_name in enumerate(table_names)}
+        self.logs = dict(sorted(self.logs.items(), key=lambda x: order.get(x[0], len(order))))
+        self.statistics.sort(key=lambda x: order.get(x.table_name, len(order)))
 
-@UpdatePolicies.register()
-class AddPrimaryKeyColumnIfMissingPolicy(PolicyBase):
-    """Adds a primary key column to the DataFrame if it is missing"""
+    def log_messages(self) -> None:
+        for _, message in self.logs.items():
+            logger.info(f"{message} (policy [{snake_to_pascal_case(self.get_id())}])")
+
+
+class TablePolicyBase(PolicyBase):
+    """Policy that reads and updates a single table at a time.
+    Table policies can be fused by the PolicyRunner into a single pass over the submission's tables."""
 
     def update(self) -> None:
+        for table_name in list(self.submission.data_tables):
+            self.visit(table_name, self.submission.data_tables[table_name], self.metadata[table_name])
+            self.submission.invalidate_profile(table_name)
 
-        for table_name, data in self.submission.data_tables.items():
-            table: Table = self.metadata[table_name]
-            if table.pk_name not in data.columns:
-                self.log(
-                    table_name,
-                    f"Added missing primary key column '{table_name}.{table.pk_name}' (assuming all new records)",
-                )
-                data[table.pk_name] = None
+    def measured_update(self) -> None:
+        for table_name in list(self.submission.data_tables):
+            self.measured_visit(table_name, self.metadata[table_name])
+
+    def visit(self, table_name: str, data_table: pd.DataFrame, table: Table) -> None:
+        raise NotImplementedError("Table policy must implement visit method")
+
+    def visit_table(self, table_name: str, table: Table) -> None:
+        """Visits the table, and records what changed if `measure` is set."""
+        if self.measure:
+            self.measured_visit(table_name, table)
+            return
+        self.visit(table_name, self.submission.data_tables[table_name], table)
+        self.submission.invalidate_profile(table_name)
+
+    def measured_visit(self, table_name: str, table: Table) -> None:
+        """Visits the table and records elapsed time and changes made to the table."""
+        before: TableSnapshot = TableSnapshot.create(self.submission.data_tables[table_name], count_nulls=True)
+        started: float = time.perf_counter()
+        self.visit(table_name, self.submission.data_tables[table_name], table)
+        self.submission.invalidate_profile(table_name)
+        elapsed: float = time.perf_counter() - started
+        after: TableSnapshot = TableSnapshot.create(self.submission.data_tables.get(table_name), count_nulls=True)
+        with self.lock:
+            self.statistics.append(PolicyStatistics.create(self.get_id(), table_name, elapsed, before, after))
+
+
+class PolicyRunner:
+    """Applies policies in priority order.
+    Consecutive table policies are fused into a single pass over the tables, where each table is visited by all
+    policies in the group before moving on to the next table. The tables are visited in parallel by a thread pool
+    if `max_workers` (default option `policy_workers`, or 1) is greater than one, and all tables are done before the
+    next group starts. Cross-table policies are applied in a separate pass.
+    Changes made by each policy are only measured if `measure` (default option `policy_report`) is set.
+    """
+
+    def __init__(
+        self,
+        metadata: Metadata,
+        submission: Submission,
+        policies: list[type[PolicyBase]] = None,
+        *,
+        max_workers: int = None,
+        measure: bool = None,
+    ) -> None:
+        self.metadata: Metadata = metadata
+        self.submission: Submission = submission
+        policies = policies if policies is not None else UpdatePolicies.get_sorted_items()
+        self.policies: list[PolicyBase] = [cls(metadata, submission) for cls in policies]
+        self.max_workers: int = max_workers or ConfigValue("options:policy_workers").resolve() or 1
+        self.measure: bool = measure if measure is not None else bool(ConfigValue("options:policy_report").resolve())
+        for policy in self.policies:
+            policy.measure = self.measure
+
+    def groups(self) -> list[list[PolicyBase]]:
+        """Groups consecutive table policies, each cross-table policy forms a group of its own."""
+        groups: list[list[PolicyBase]] = []
+        for policy in self.policies:
+            if groups and isinstance(policy, TablePolicyBase) and isinstance(groups[-1][-1], TablePolicyBase):
+                groups[-1].append(policy)
+            else:
+                groups.append([policy])
+        return groups
+
+    def run(self) -> None:
+        for group in self.groups():
+            if isinstance(group[0], TablePolicyBase):
+                self.visit_tables(group)
+            else:
+                group[0].apply()
+
+        self.submission.policy_statistics.extend(x for policy in self.policies for x in policy.statistics)
+
+    def visit_tables(self, policies: list[TablePolicyBase]) -> None:
+        """Applies a group of table policies in a single pass over the submission's tables."""
+        enabled: list[TablePolicyBase] = []
+        for policy in policies:
+            if policy.is_disabled():
+                logger.info(f"Policy '{policy.get_id()}' is disabled")
+            else:
+                enabled.append(policy)
+
+        table_names: list[str] = list(self.submission.data_tables)
+        tables: dict[str, Table] = {table_name: self.metadata[table_name] for table_name in table_names}
+        max_workers: int = min(self.max_workers, len(table_names))
+
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures: list[Future] = [
+                    executor.submit(self.visit_table, table_name, tables[table_name], enabled)
+                    for table_name in table_names
+                ]
+                for future in futures:
+                    future.result()
+        else:
+            for table_name in table_names:
+                self.visit_table(table_name, tables[table_name], enabled)
+
+        for policy in enabled:
+            policy.order_by_tables(table_names)
+            policy.log_messages()
+
+    def visit_table(self, table_name: str, table: Table, policies: list[TablePolicyBase]) -> None:
+        for policy in policies:
+            try:
+                policy.visit_table(table_name, table)
+            except:  # pylint: disable=bare-except
+                logger.exception(f"Error applying policy ({snake_to_pascal_case(policy.get_id())})")
+                raise
+
+
+@UpdatePolicies.register()
+class AddPrimaryKeyColumnIfMissingPolicy(TablePolicyBase):
+    """Adds a primary key column to the DataFrame if it is missing"""
+
+    def visit(self, table_name: str, data_table: pd.DataFrame, table: Table) -> None:
+        if table.pk_name not in data_table.columns:
+            self.log(
+                table_name,
+                f"Added missing primary key column '{table_name}.{table.pk_name}' (assuming all new records)",
+            )
+            data_table[table.pk_name] = None
 
 
 @UpdatePolicies.register()
@@ -94,10 +335,8 @@ class UpdateMissingForeignKeyPolicy(PolicyBase):
             for fk_name, fk_value in cfg.items():
                 if fk_name not in data.columns:
                     data[fk_name] = fk_value
-                    self.log(
-                        table_name, f"Added missing column '{fk_name}' to '{table_name}' using value '{fk_value}'"
-                    )
-                elif data[fk_name].isnull().all():                    
+                    self.log(table_name, f"Added missing column '{fk_name}' to '{table_name}' using value '{fk_value}'")
+                elif data[fk_name].isnull().all():
                     data[fk_name] = fk_value
                     self.log(table_name, f"Added default value '{fk_value}' to '{fk_name}' in '{table_name}'")
 
@@ -109,6 +348,9 @@ class UpdateMissingForeignKeyPolicy(PolicyBase):
                         f"Updated {n_count} missing values '{table_name}.{fk_name}' to '{fk_value}'",
                     )
 
+            self.submission.invalidate_profile(table_name)
+
+
 @UpdatePolicies.register()
 class AddIdentityMappingSystemIdToPublicIdPolicy(PolicyBase):
     """Rule: if an FK table is missing then add the table using system_id as public_id.
@@ -123,31 +365,36 @@ class AddIdentityMappingSystemIdToPublicIdPolicy(PolicyBase):
     """
 
     def table_names(self) -> set[str]:
-        includes: set[str] = set(
-            ConfigValue(f"policies.{self.get_id()}.tables.include").resolve() or []
-        ) or set(self.metadata.sead_schema.keys())
-        excludes: set[str] =  set(ConfigValue(f"policies.{self.get_id()}.tables.exclude").resolve() or [])
+        includes: set[str] = set(ConfigValue(f"policies.{self.get_id()}.tables.include").resolve() or []) or set(
+            self.metadata.sead_schema.keys()
+        )
+        excludes: set[str] = set(ConfigValue(f"policies.{self.get_id()}.tables.exclude").resolve() or [])
         return includes - excludes
 
     def update(self) -> None:
 
-        for table_name in self.table_names():
+        table_names: set[str] = self.table_names()
 
-            if table_name in self.submission:
-                continue
+        referenced_keysets: dict[str, set[int]] = {
+            table_name: keys
+            for table_name, keys in self.submission.get_referenced_keysets(self.metadata).items()
+            if keys and table_name in table_names and table_name not in self.submission
+        }
+
+        if not referenced_keysets:
+            return
 
-            referenced_keys: list[int] = sorted(self.submission.get_referenced_keyset(self.metadata, table_name))
+        public_primary_keys: dict[str, set[int]] = self.metadata.find_primary_keys(referenced_keysets)
 
-            if not referenced_keys:
-                continue
+        for table_name in sorted(referenced_keysets):
 
-            meta_table: Table = self.metadata[table_name]
-            pk_name: str = meta_table.pk_name
+            referenced_keys: list[int] = sorted(referenced_keysets[table_name])
+            pk_name: str = self.metadata[table_name].pk_name
 
-            public_primary_keys: set[int] = self.metadata.get_primary_keys(table_name)
-            if (set(referenced_keys) - public_primary_keys):
+            missing_keys: set[int] = set(referenced_keys) - public_primary_keys.get(table_name, set())
+            if missing_keys:
                 logger.warning(
-                    f"Table '{table_name}' has referenced keys that are not primary keys: {', '.join(map(str, referenced_keys))}"
+                    f"Table '{table_name}' has referenced keys that are not primary keys: {', '.join(map(str, sorted(missing_keys)))}"
                 )
 
             self.submission.data_tables[table_name] = pd.DataFrame(
@@ -161,31 +408,27 @@ class AddIdentityMappingSystemIdToPublicIdPolicy(PolicyBase):
 
 
 @UpdatePolicies.register()
-class UpdateTypesBasedOnSeadSchema(PolicyBase):
+class UpdateTypesBasedOnSeadSchema(TablePolicyBase):
     """Rule: update data types based on SEAD schema
 
     For each table in the submission,
         update the data types of the columns based on the SEAD schema
     """
 
-    def update(self) -> None:
+    DTYPES: dict[str, str] = {'smallint': 'Int16', 'integer': 'Int32', 'bigint': 'Int64'}
 
-        for table_name in self.submission.data_tables:
+    def visit(self, table_name: str, data_table: pd.DataFrame, table: Table) -> None:
 
-            data_table: pd.DataFrame = self.submission.data_tables[table_name]
-            table_spec: Table = self.metadata[table_name]
+        for column_name, column_spec in table.columns.items():
 
-            for column_name, column_spec in table_spec.columns.items():
+            dtype: str | None = self.DTYPES.get(column_spec.data_type)
+            if dtype is None or column_name not in data_table.columns:
+                continue
 
-                if column_name not in data_table.columns:
-                    continue
+            if data_table[column_name].dtype == dtype:
+                continue
 
-                if column_spec.data_type == 'smallint':
-                    data_table[column_name] = data_table[column_name].astype('Int16')
-                elif column_spec.data_type == 'integer':
-                    data_table[column_name] = data_table[column_name].astype('Int32')
-                elif column_spec.data_type == 'bigint':
-                    data_table[column_name] = data_table[column_name].astype('Int64')
+            data_table[column_name] = data_table[column_name].astype(dtype, copy=False)
 
 
 # @UpdatePolicies.register()
@@ -218,7 +461,7 @@ class UpdateTypesBasedOnSeadSchema(PolicyBase):
 
 
 @UpdatePolicies.register()
-class IfSystemIdIsMissingSetSystemIdToPublicId(PolicyBase):
+class IfSystemIdIsMissingSetSystemIdToPublicId(TablePolicyBase):
     """Rule: assign temporary public primary key to new lookup table rows.
 
     For new lookup table rows,
@@ -227,43 +470,54 @@ class IfSystemIdIsMissingSetSystemIdToPublicId(PolicyBase):
     In this case, the public primary key is assigned upon submission commit to the database
     """
 
-    def update(self) -> None:
-        """For each table in index, update system_id to public_id if isnan. This should be avoided though."""
-        for table_name in self.submission.data_tables:
-
-            data_table: pd.DataFrame = self.submission.data_tables[table_name]
-            table_spec: Table = self.metadata[table_name]
+    def visit(self, table_name: str, data_table: pd.DataFrame, table: Table) -> None:
+        """Update system_id to public_id if isnan. This should be avoided though."""
 
-            pk_name: str = table_spec.pk_name
+        pk_name: str = table.pk_name
 
-            if pk_name == "ceramics_id":
-                pk_name = "ceramic_id"
+        if pk_name == "ceramics_id":
+            pk_name = "ceramic_id"
 
-            if data_table is None or pk_name not in data_table.columns:
-                continue
+        if data_table is None or pk_name not in data_table.columns:
+            return
 
-            if "system_id" not in data_table.columns:
-                raise ValueError(f'critical error Table {table_name} has no column named "system_id"')
+        if "system_id" not in data_table.columns:
+            raise ValueError(f'critical error Table {table_name} has no column named "system_id"')
 
-            # Update system_id to public_id if isnan. This should be avoided though.
-            data_table.loc[np.isnan(data_table.system_id), "system_id"] = data_table.loc[
-                np.isnan(data_table.system_id), pk_name
-            ]
-            self.log(table_name, f"Updated system_id to public_id for new records in '{table_name}'")
+        # Update system_id to public_id if isnan. This should be avoided though.
+        data_table.loc[np.isnan(data_table.system_id), "system_id"] = data_table.loc[
+            np.isnan(data_table.system_id), pk_name
+        ]
+        self.log(table_name, f"Updated system_id to public_id for new records in '{table_name}'")
 
 
 @UpdatePolicies.register()
 class IfForeignKeyValueIsMissingAddIdentityMappingToForeignKeyTable(PolicyBase):
     """Any foreign key value that is missing in the submission is added to the foreign key table."""
 
-    def fix_dtypes(self, data_table: pd.DataFrame) -> pd.DataFrame:
-        """Fix data types of the column in the data table."""
+    def fix_dtypes(self, table_name: str, data_table: pd.DataFrame) -> pd.DataFrame:
+        """Casts columns in the data table that only have missing values to their SEAD data types, in a single
+        `astype` call. Columns that already have the SEAD data type, and all other columns, are not copied."""
+        profile: TableProfile = self.submission.get_profile(table_name)
+        dtypes: dict[str, str] = {}
         for column_name in data_table.columns:
-            if data_table[column_name].isnull().all():
+            if profile.all_null(column_name):
                 dtype: str | None = self.metadata.sead_dtypes.get(column_name, None)
-                if dtype:
-                    data_table[column_name] = data_table[column_name].astype(dtype=dtype)
-        return data_table
+                if dtype and data_table[column_name].dtype != dtype:
+                    dtypes[column_name] = dtype
+        return data_table.astype(dtypes, copy=False) if dtypes else data_table
+
+    def create_rows(self, dtypes: dict[str, Any], pk_name: str, keys: np.ndarray) -> pd.DataFrame:
+        """Create identity mapping rows for `keys`, column by column, using the data table's dtypes.
+        Columns that cannot hold missing values (e.g. int64) are allocated using the corresponding nullable type."""
+        index: pd.RangeIndex = pd.RangeIndex(len(keys))
+        columns: dict[str, pd.Series] = {}
+        for column_name, dtype in dtypes.items():
+            if column_name in ('system_id', pk_name):
+                columns[column_name] = pd.Series(keys, index=index).astype(dtype)
+            else:
+                columns[column_name] = pd.Series(None, index=index, dtype=object).astype(nullable_dtype(dtype))
+        return pd.DataFrame(columns, index=index)
 
     def update(self) -> pd.DataFrame:
 
@@ -273,9 +527,11 @@ class IfForeignKeyValueIsMissingAddIdentityMappingToForeignKeyTable(PolicyBase):
 
             table_name: str = table.table_name
 
-            referenced_keys: list[int] = sorted(self.submission.get_referenced_keyset(self.metadata, table_name))
+            referenced_keys: np.ndarray = np.fromiter(
+                sorted(self.submission.get_referenced_keyset(self.metadata, table_name)), dtype=np.int64
+            )
 
-            if not referenced_keys:
+            if len(referenced_keys) == 0:
                 continue
 
             if table_name not in self.submission:
@@ -285,25 +541,16 @@ class IfForeignKeyValueIsMissingAddIdentityMappingToForeignKeyTable(PolicyBase):
             data_table: pd.DataFrame = self.submission.data_tables[table_name]
             pk_name: str = sead_schema[table_name].pk_name
 
-            missing_keys: list[int] = [k for k in referenced_keys if k not in data_table['system_id'].values]
+            missing_keys: np.ndarray = referenced_keys[
+                ~np.isin(referenced_keys, data_table['system_id'].dropna().to_numpy())
+            ]
 
-            if not missing_keys:
+            if len(missing_keys) == 0:
                 continue
 
-            template: dict[str, int] = {c: None for c in data_table.columns}
-            rows_to_add: list[dict[str, int]] = [
-                template | {'system_id': system_id, pk_name: system_id} for system_id in missing_keys
-            ]
-
-            if len(rows_to_add) > 0:
-                new_rows: pd.DataFrame = pd.DataFrame(rows_to_add)
-                data_table = self.fix_dtypes(data_table)
-                new_rows = self.fix_dtypes(new_rows)
-                data_table = (
-                    pd.DataFrame(rows_to_add)
-                    if len(data_table) == 0
-                    else pd.concat([data_table, new_rows], ignore_index=True)
-                )
+            data_table = self.fix_dtypes(table_name, data_table)
+            new_rows: pd.DataFrame = self.create_rows(data_table.dtypes.to_dict(), pk_name, missing_keys)
+            data_table = new_rows if len(data_table) == 0 else pd.concat([data_table, new_rows], ignore_index=True)
 
             self.submission.data_tables[table_name] = data_table
 
@@ -314,61 +561,57 @@ class IfForeignKeyValueIsMissingAddIdentityMappingToForeignKeyTable(PolicyBase):
 
 
 @UpdatePolicies.register()
-class DropIgnoredColumns(PolicyBase):
+class DropIgnoredColumns(TablePolicyBase):
     """Rule: drop ignored columns from data so that they are excluded from uploaded submission data.
     This rule currently only applies "date_updated" and "*_uuid" columns.
     """
 
     def filter_columns(self, patterns: list[str], columns: list[str]) -> list[str]:
         """Filter out columns that are ignored."""
-        return [c for c in columns if any(fnmatch(c, x) for x in patterns)]
+        return column_matcher(patterns).filter(columns)
 
-    def update(self) -> None:
-        """For each table in index, drop column if it is ignoderd."""
+    @cached_property
+    def drop_patterns(self) -> list[str]:
+        return ConfigValue(f"policies.{self.get_id()}.columns").resolve() or []
 
-        drop_patterns: list[str] = ConfigValue(f"policies.{self.get_id()}.columns").resolve() or []
+    def visit(self, table_name: str, data_table: pd.DataFrame, table: Table) -> None:
+        """Drop column if it is ignored."""
 
-        if not drop_patterns:
+        if not self.drop_patterns:
             return
 
-        for table_name, data in self.submission.data_tables.items():
-            columns: list[str] = self.filter_columns(drop_patterns, data.columns)
-            if not columns:
-                continue
+        columns: list[str] = self.filter_columns(self.drop_patterns, data_table.columns)
+        if not columns:
+            return
 
-            data.drop(columns=columns, inplace=True)
-            self.log(table_name, f"Dropped column(s) {', '.join(columns)} from {table_name}")
+        data_table.drop(columns=columns, inplace=True)
+        self.log(table_name, f"Dropped column(s) {', '.join(columns)} from {table_name}")
 
 
 @UpdatePolicies.register()
-class IfLookupWithNoNewDataThenKeepOnlySystemIdPublicId(PolicyBase):
+class IfLookupWithNoNewDataThenKeepOnlySystemIdPublicId(TablePolicyBase):
     """Rule: if table is a lookup table and no new data then drop all columns except
     system_id and public_id. The table has new data of any public PK (table.pk_name) is None or NaN
     """
 
-    def update(self) -> None:
-        """For each table in index, drop column if it is ignored."""
-
-        for table_name in self.submission.data_tables:
-
-            data_table: pd.DataFrame = self.submission.data_tables[table_name]
-            table: Table = self.metadata[table_name]
+    def visit(self, table_name: str, data_table: pd.DataFrame, table: Table) -> None:
+        """Drop all columns except system_id and public_id if the table is a lookup table without new data."""
 
-            if not table.is_lookup:
-                continue
+        if not table.is_lookup:
+            return
 
-            pk_name: str = table.pk_name
+        pk_name: str = table.pk_name
 
-            if pk_name not in data_table.columns:
-                continue
+        if pk_name not in data_table.columns:
+            return
 
-            if data_table[pk_name].isnull().any():
-                continue
+        if self.submission.get_profile(table_name).any_null(pk_name):
+            return
 
-            columns_to_drop: list[str] = [c for c in data_table.columns if c not in ['system_id', pk_name]]
+        columns_to_drop: list[str] = [c for c in data_table.columns if c not in ['system_id', pk_name]]
 
-            if not columns_to_drop:
-                continue
+        if not columns_to_drop:
+            return
 
-            data_table.drop(columns=columns_to_drop, inplace=True)
-            self.log(table_name, f"Dropped column(s) {', '.join(columns_to_drop)} from {table_name}")
+        data_table.drop(columns=columns_to_drop, inplace=True)
+        self.log(table_name, f"Dropped column(s) {', '.join(columns_to_drop)} from {table_name}")
@@ -1,8 +1,7 @@
-import io
 import time
 from dataclasses import dataclass, field
 from os.path import basename, join, splitext
-from typing import Type
+from typing import IO, Type
 
 from loguru import logger
 
@@ -11,6 +10,7 @@ from importer.configuration.inject import ConfigValue
 from . import utility
 from .dispatchers import IDispatcher, to_xml
 from .metadata import Metadata
+from .policies import write_policy_report
 from .repository import SubmissionRepository
 from .specification import SpecificationError, SubmissionSpecification
 from .submission import Submission
@@ -44,16 +44,36 @@ class Options:
     database: dict[str, str] = field(default_factory=dict)
     transfer_format: str = field(default="xml")
     dump_to_csv: bool = field(default=False)
+    cache_folder: str = field(default=None)
+    policy_workers: int = field(default=None)
+    policy_report: bool = field(default=False)
+    specification_workers: int = field(default=None)
+    fail_fast: bool = field(default=False)
+    max_errors: int = field(default=None)
+    findings_report: bool = field(default=False)
+    xml_buffer_size: int = field(default=None)
+    xml_serializer: str = field(default=None)
+    compression: str = field(default=None)
 
     def __post_init__(self) -> None:
 
+        if self.compression and self.compression not in utility.COMPRESSION_EXTENSIONS:
+            raise ValueError(f"unknown compression {self.compression}")
+
+        if self.compression and self.compression not in utility.available_compressions():
+            raise ValueError(
+                f"{self.compression} compression requires the {utility.COMPRESSION_PACKAGES[self.compression]} package"
+            )
+
         if self.filename:
-            self.basename: str = splitext(basename(self.filename))[0]
+            self.basename: str = splitext(basename(utility.strip_compression_extension(self.filename)))[0]
             self.target: str = (
                 join(self.output_folder, f"{self.basename}_{time.strftime('%Y%m%d-%H%M%S')}.xml")
                 if self.timestamp
                 else join(self.output_folder, f"{self.basename}.xml")
             )
+            if self.compression:
+                self.target += utility.COMPRESSION_EXTENSIONS[self.compression]
         default_ignore_patterns: list[str] = ConfigValue("options:ignore_columns").resolve() or []
         self.ignore_columns: list[str] = (
             self.ignore_columns if self.ignore_columns is not None else default_ignore_patterns
@@ -88,9 +108,29 @@ class ImportService:
         self.metadata: Metadata = metadata or Metadata(opts.db_uri())
         self.dispatcher_cls: Type[IDispatcher] = dispatcher_cls or to_xml.XmlProcessor
         self.specification: SubmissionSpecification = SubmissionSpecification(
-            metadata=self.metadata, ignore_columns=self.opts.ignore_columns, raise_errors=False
+            metadata=self.metadata,
+            ignore_columns=self.opts.ignore_columns,
+            raise_errors=False,
+            fail_fast=self.opts.fail_fast,
+            max_errors=self.opts.max_errors,
+            cache_folder=self.opts.cache_folder,
+            report_filename=(
+                utility.path_add_suffix(self.opts.target, "_findings", ".ndjson")
+                if self.opts.findings_report and self.opts.target
+                else None
+            ),
         )
 
+    def create_dispatcher(self, outstream: IO) -> IDispatcher:
+        """Returns a dispatcher that writes to `outstream`. The XML output options only apply to the XML dispatcher."""
+        if issubclass(self.dispatcher_cls, to_xml.XmlProcessor):
+            return self.dispatcher_cls(
+                outstream,
+                buffer_size=self.opts.xml_buffer_size,
+                serializer=self.opts.xml_serializer,
+            )
+        return self.dispatcher_cls(outstream)
+
     @utility.log_decorator(
         enter_message=" ---> generating target file(s)...", exit_message=" ---> target file(s) created", level="DEBUG"
     )
@@ -100,10 +140,18 @@ class ImportService:
         Stores submission in output_filename and returns filename for a cleaned up version of the XML
         """
 
-        with io.open(self.opts.target, "w", encoding="utf8") as outstream:
-            self.dispatcher_cls(outstream).dispatch(self.metadata, submission, self.opts.table_names)
+        with utility.open_compressed(self.opts.target, "w", encoding="utf8") as outstream:
+            dispatcher: IDispatcher = self.create_dispatcher(outstream)
+            dispatcher.dispatch(self.metadata, submission, self.opts.table_names)
+
+        if self.opts.policy_report and submission.policy_statistics:
+            report_filename: str = utility.path_add_suffix(self.opts.target, "_policies", ".json")
+            write_policy_report(submission.policy_statistics, report_filename)
+            logger.debug(f" ---> policy report created: {report_filename}")
 
-        if format_document:
+        if format_document and self.dispatcher_cls.indented:
+            logger.debug(" ---> target file is already indented, skipping tidy XML")
+        elif format_document:
             self.opts.target = utility.tidy_xml(self.opts.target, remove_source=True)
 
         logger.debug(f" ---> target file created: {self.opts.target}")
@@ -11,7 +11,7 @@ from importer.metadata import Metadata
 from importer.process import ImportService, Options
 from importer.scripts.utility import update_arguments_from_options_file
 from importer.submission import Submission
-from importer.utility import configure_logging, strip_path_and_extension
+from importer.utility import available_compressions, configure_logging, is_xml_filename, strip_path_and_extension
 
 dotenv.load_dotenv(dotenv.find_dotenv())
 
@@ -37,11 +37,28 @@ dotenv.load_dotenv(dotenv.find_dotenv())
 @click.option("--xml-filename", type=str, default=None, help="Name of existing XML file to use.")
 @click.option("--log-folder", type=str, default="./logs", help="Name of existing XML file to use.")
 @click.option("--check-only", type=bool, is_flag=True, default=False, help="Only check if file seems OK.")
+@click.option(
+    "--fail-fast/--no-fail-fast", type=bool, is_flag=True, default=False, help="Stop checking at the first error."
+)
+@click.option("--max-errors", type=int, default=None, help="Stop checking when this number of errors is found.")
+@click.option(
+    "--findings-report/--no-findings-report",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Store specification findings as an NDJSON report next to the target file.",
+)
 @click.option("--register/--no-register", type=bool, is_flag=True, default=False, help="Register file in the database.")
 @click.option("--explode/--no-explode", type=bool, is_flag=True, default=False, help="Explode XML into public tables.")
 @click.option(
     "--tidy-xml/--no-tidy-xml", type=bool, is_flag=True, default=False, help="Run XML formatting tool on document."
 )
+@click.option(
+    "--compression",
+    type=click.Choice(available_compressions()),
+    default=None,
+    help="Stream target XML through gzip (.xml.gz) or, if zstandard is installed, zstd (.xml.zst) compression.",
+)
 @click.option(
     "--timestamp/--no-timestamp", type=bool, is_flag=True, default=True, help="Add timestamp to target XML filename."
 )
@@ -53,6 +70,16 @@ dotenv.load_dotenv(dotenv.find_dotenv())
     default=False,
     help="Store (policy-updated) submission data as CSV files in output folder.",
 )
+@click.option(
+    "--policy-report/--no-policy-report",
+    type=bool,
+    is_flag=True,
+    default=False,
+    help="Measure what each policy changes and store it as a JSON report next to the target file.",
+)
+@click.option(
+    "--cache-folder", type=str, default=None, help="Cache post-policy submission data in folder (reused if unchanged)."
+)
 @click.pass_context
 def import_file(
     ctx,
@@ -70,18 +97,25 @@ def import_file(
     table_names: str,
     xml_filename: str,
     check_only: bool,
+    fail_fast: bool,
+    max_errors: int,
+    findings_report: bool,
     register: bool,
     explode: bool,
     log_folder: str,
     timestamp: bool,
     tidy_xml: bool,
+    compression: str,
     transfer_format: str,
     dump_to_csv: bool,
+    policy_report: bool,
+    cache_folder: str,
     options_filename: str = None,
 ) -> None:
     """
     Imports a new SEAD data submission to the SEAD ClearingHouse database. The source data is either
-    an Excel file or an XML file that has previously been generated with this program.
+    an Excel file or an XML file that has previously been generated with this program. The XML file
+    may be gzip (.xml.gz) or zstd (.xml.zst, requires the zstandard package) compressed.
 
     The content of the Excel file is processed and stored in an XML file that conforms to the
     clearinghouse data import schema.
@@ -141,7 +175,7 @@ def workflow(opts: Options) -> None:
 
     if not opts.use_existing_submission:
 
-        if opts.filename.endswith(".xml"):
+        if is_xml_filename(opts.filename):
             opts.xml_filename = opts.filename
             opts.filename = None
 
@@ -160,7 +194,7 @@ def workflow(opts: Options) -> None:
         else (
             opts.xml_filename
             if isinstance(opts.xml_filename, str)
-            else Submission.load(metadata=metadata, source=opts.filename)
+            else Submission.load(metadata=metadata, source=opts.filename, cache_folder=opts.cache_folder)
         )
     )
     ImportService(metadata=metadata, opts=opts).process(submission=submission)
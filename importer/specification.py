@@ -1,7 +1,18 @@
 import abc
-from dataclasses import dataclass, field
-from fnmatch import fnmatch
+import contextlib
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from enum import IntEnum
 from functools import cached_property
+from typing import ClassVar, Iterable, Iterator, TextIO
 
 import numpy as np
 import pandas as pd
@@ -9,20 +20,46 @@ from loguru import logger
 
 from importer.configuration.inject import ConfigValue
 
-from .metadata import Metadata, Table
-from .submission import Submission
-from .utility import Registry, log_decorator
+from .cache import SpecificationCache, hash_config, hash_data_frame
+from .metadata import Column, Metadata, Table
+from .submission import Submission, TableProfile
+from .utility import ColumnMatcher, Registry, column_matcher, log_decorator
 
 
 class SpecificationRegistry(Registry):
     items: dict = {}
 
 
+@dataclass
+class Finding:
+    """A single validation finding. Rows are (zero-based) row positions in the data table, capped at MAX_ROWS."""
+
+    MAX_ROWS: ClassVar[int] = 1000
+
+    severity: str
+    rule: str
+    table: str | None
+    column: str | None
+    message: str
+    row_count: int | None = None
+    rows: list[int] | None = None
+
+
 @dataclass
 class SpecificationMessages:
     errors: list[str] = field(default_factory=list)
     warnings: list[str] = field(default_factory=list)
     infos: list[str] = field(default_factory=list)
+    findings: list[Finding] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self.findings = [Finding(**x) if isinstance(x, dict) else x for x in self.findings]
+
+    def extend(self, other: "SpecificationMessages") -> None:
+        self.errors.extend(other.errors)
+        self.warnings.extend(other.warnings)
+        self.infos.extend(other.infos)
+        self.findings.extend(other.findings)
 
     def uniqify(self) -> None:
         self.errors = sorted(set(self.errors))
@@ -40,20 +77,73 @@ class SpecificationMessages:
         return msgs
 
 
+@dataclass
+class SpecificationTiming:
+    """Elapsed time of a single (specification, table) job. Cached jobs are not run and have no elapsed time."""
+
+    rule: str
+    table: str
+    elapsed: float
+    cached: bool = False
+
+
+class FindingsWriter:
+    """Writes findings incrementally to a newline delimited JSON (NDJSON) file"""
+
+    def __init__(self, filename: str) -> None:
+        self.filename: str = filename
+        self.fp: TextIO | None = None
+
+    def __enter__(self) -> "FindingsWriter":
+        if os.path.dirname(self.filename):
+            os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        self.fp = open(self.filename, "w", encoding="utf-8")  # pylint: disable=consider-using-with
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.fp.close()
+
+    def write(self, findings: list[Finding]) -> None:
+        for finding in findings:
+            self.fp.write(json.dumps(asdict(finding)) + "\n")
+        self.fp.flush()
+
+
+class SpecificationStage(IntEnum):
+    """Specifications are run in stage order, cheapest first"""
+
+    STRUCTURAL = 1
+    TYPE = 2
+    INTEGRITY = 3
+
+
 class SpecificationError(Exception):
     def __init__(self, messages: SpecificationMessages) -> None:
         super().__init__("Submission specification failed")
         self.messages: SpecificationMessages = messages
 
 
+@functools.cache
+def specification_version(cls: type) -> str:
+    """Returns a digest of the source code of the module that defines the specification."""
+    source: str = inspect.getsource(sys.modules[cls.__module__])
+    return hashlib.sha256(f"{cls.__qualname__}:{source}".encode("utf-8")).hexdigest()
+
+
 class SpecificationBase(abc.ABC):
+    stage: SpecificationStage = SpecificationStage.INTEGRITY
+    reads_other_tables: bool = False
+    cacheable: bool = True
+
     def __init__(self, metadata: Metadata, messages: SpecificationMessages, ignore_columns: list[str]) -> None:
         self.metadata: Metadata = metadata
         self.messages: SpecificationMessages = messages
         self.ignore_columns: list[str] = ignore_columns or ConfigValue("options:ignore_columns").resolve() or []
+        self.ignore_matcher: ColumnMatcher = column_matcher(self.ignore_columns)
+        self.columns: dict[str, list[Column]] = {}
 
     def is_ignored(self, column_name: str) -> bool:
-        return any(fnmatch(column_name, x) for x in self.ignore_columns)
+        return self.ignore_matcher.match(column_name)
 
     @property
     def errors(self) -> list[str]:
@@ -71,18 +161,58 @@ class SpecificationBase(abc.ABC):
         self.messages.errors = []
         self.messages.warnings = []
         self.messages.infos = []
+        self.messages.findings = []
 
-    def warn(self, message: str) -> None:
+    def warn(self, message: str, column: str = None, rows: Iterable[int] = None) -> None:
         self.warnings.append(f'{message}')
+        self.add_finding("warning", message, column, rows)
 
-    def error(self, message: str) -> None:
+    def error(self, message: str, column: str = None, rows: Iterable[int] = None) -> None:
         self.errors.append(f'{message}')
+        self.add_finding("error", message, column, rows)
 
-    def info(self, message: str) -> None:
+    def info(self, message: str, column: str = None, rows: Iterable[int] = None) -> None:
         self.infos.append(f'{message}')
+        self.add_finding("info", message, column, rows)
+
+    def add_finding(self, severity: str, message: str, column: str | None, rows: Iterable[int] | None) -> None:
+        positions: np.ndarray | None = None if rows is None else np.asarray(rows, dtype=np.int64)
+        self.messages.findings.append(
+            Finding(
+                severity=severity,
+                rule=type(self).__name__,
+                table=None,
+                column=column,
+                message=message,
+                row_count=None if positions is None else len(positions),
+                rows=None if positions is None else positions[: Finding.MAX_ROWS].tolist(),
+            )
+        )
 
-    def get_columns(self, table_name: str) -> list[Table]:
-        return [column for column in self.metadata[table_name].columns.values() if not self.is_ignored(column.column_name)]
+    def get_columns(self, table_name: str) -> list[Column]:
+        """Returns the table's non-ignored columns (computed once per table)."""
+        if table_name not in self.columns:
+            self.columns[table_name] = [
+                x for x in self.metadata[table_name].columns.values() if not self.is_ignored(x.column_name)
+            ]
+        return self.columns[table_name]
+
+    def to_keys(self, table_name: str, column_name: str, values: pd.Series, max_sample: int = 10) -> pd.Series:
+        """Returns key values as float64 (missing values are NaN). Values that are not missing, but not numeric either,
+        are reported as errors and are missing in the result."""
+        keys: pd.Series = pd.to_numeric(values, errors="coerce").astype("float64")
+        non_numeric_mask: np.ndarray = (values.notna() & keys.isna()).to_numpy()
+        if non_numeric_mask.any():
+            invalid: np.ndarray = pd.unique(values[non_numeric_mask])
+            sample: str = ", ".join(repr(x) for x in invalid[:max_sample])
+            ellipsis: str = " ..." if len(invalid) > max_sample else ""
+            self.error(
+                f"Table {table_name}: {int(non_numeric_mask.sum())} non-numeric key value(s) in column {column_name}: "
+                f"{sample}{ellipsis}",
+                column=column_name,
+                rows=np.flatnonzero(non_numeric_mask),
+            )
+        return keys
 
     @abc.abstractmethod
     def is_satisfied_by(self, submission: Submission, table_name: str) -> None: ...
@@ -98,14 +228,29 @@ class SubmissionSpecification(SpecificationBase):
         messages: SpecificationMessages = None,
         ignore_columns: list[str] = None,
         raise_errors: bool = True,
+        max_workers: int = None,
+        fail_fast: bool = False,
+        max_errors: int = None,
+        cache_folder: str = None,
+        report_filename: str = None,
     ) -> None:
         super().__init__(metadata, messages or SpecificationMessages(), ignore_columns)
         self.raise_errors: bool = raise_errors
+        self.max_errors: int | None = 1 if fail_fast else (max_errors or None)
+        self.cache: SpecificationCache | None = SpecificationCache(cache_folder) if cache_folder else None
+        self.table_hashes: dict[str, str | None] = {}
+        self.timings: list[SpecificationTiming] = []
+        self.report_filename: str | None = report_filename
+        self.max_workers: int = max_workers or ConfigValue("options:specification_workers").resolve() or 1
+        self.local: threading.local = threading.local()
+        self.lock: threading.Lock = threading.Lock()
 
     @log_decorator(enter_message=" ---> checking submission...", exit_message=" ---> submission checked", level='DEBUG')
     def is_satisfied_by(self, submission: Submission, _: str = None) -> bool:
         """
         Check if the given submission satisfies all the specifications defined in the SpecificationRegistry.
+        Specifications are run stage by stage (structural, type, integrity), and a stage starts when the previous is
+        done. If an error budget is set (`max_errors` or `fail_fast`), the check stops as soon as the budget is used up.
 
         Parameters:
             submission (SubmissionData): The submission data to be checked.
@@ -115,22 +260,167 @@ class SubmissionSpecification(SpecificationBase):
             bool: True if all the specifications are satisfied, False otherwise.
         """
         self.clear()
-        for cls in SpecificationRegistry.items.values():
-            specification: SpecificationBase = cls(
-                self.metadata, messages=self.messages, ignore_columns=self.ignore_columns
-            )
-            for table_name in submission.data_tables.keys():
-                specification.is_satisfied_by(submission, table_name)
+        self.table_hashes = {}
+        self.timings = []
+
+        with FindingsWriter(self.report_filename) if self.report_filename else contextlib.nullcontext() as writer:
+            for stage in sorted(set(cls.stage for cls in SpecificationRegistry.items.values())):
+                jobs: list[tuple[type[SpecificationBase], str]] = [
+                    (cls, table_name)
+                    for cls in SpecificationRegistry.items.values()
+                    if cls.stage == stage
+                    for table_name in submission.data_tables.keys()
+                ]
+                for messages, timing in self.run_jobs(submission, jobs):
+                    self.timings.append(timing)
+                    self.merge(messages, writer)
+                    if self.is_budget_exhausted():
+                        break
+
+                if self.is_budget_exhausted():
+                    self.info(f"Submission check stopped early: error budget of {self.max_errors} error(s) used up")
+                    break
+
+            if writer is not None:
+                writer.write(self.messages.findings)
+                self.messages.findings = []
 
         self.messages.uniqify()
 
         self.log_messages()
+        self.log_timings()
 
-        if self.raise_errors and len(specification.errors) > 0:
+        if self.raise_errors and len(self.errors) > 0:
             raise SpecificationError(self.messages)
 
         return len(self.errors) == 0
 
+    def merge(self, messages: SpecificationMessages, writer: FindingsWriter | None) -> None:
+        """Adds a job's messages. Findings are written to the report (if any) instead of being kept in memory."""
+        if writer is not None:
+            writer.write(messages.findings)
+            messages = SpecificationMessages(messages.errors, messages.warnings, messages.infos)
+        self.messages.extend(messages)
+
+    def is_budget_exhausted(self) -> bool:
+        return self.max_errors is not None and len(set(self.errors)) >= self.max_errors
+
+    def run_jobs(
+        self, submission: Submission, jobs: list[tuple[type[SpecificationBase], str]]
+    ) -> Iterator[tuple[SpecificationMessages, SpecificationTiming]]:
+        """Runs (specification, table) jobs, on a thread pool if `max_workers` (default option `specification_workers`,
+        or 1) is greater than one. Yields each job's messages and timing in job order.
+        Jobs that haven't started are cancelled if the caller stops iterating."""
+        max_workers: int = min(self.max_workers, len(jobs))
+        if max_workers <= 1:
+            for cls, table_name in jobs:
+                yield self.run_job(submission, cls, table_name)
+            return
+
+        _ = self.metadata.sead_schema
+        executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures: list[Future] = [
+                executor.submit(self.run_job, submission, cls, table_name) for cls, table_name in jobs
+            ]
+            for future in futures:
+                yield future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def run_job(
+        self, submission: Submission, cls: type[SpecificationBase], table_name: str
+    ) -> tuple[SpecificationMessages, SpecificationTiming]:
+        """Checks `table_name` against a single specification, collecting messages separately.
+        If a cache is used, messages are reused for an unchanged table, metadata and specification."""
+        started: float = time.perf_counter()
+        key: str | None = self.job_key(submission, cls, table_name) if self.cache and cls.cacheable else None
+        if key:
+            cached: dict[str, list[str]] | None = self.cache.load(key)
+            if cached is not None:
+                elapsed: float = time.perf_counter() - started
+                return SpecificationMessages(**cached), SpecificationTiming(cls.__name__, table_name, elapsed, True)
+
+        specification: SpecificationBase = self.get_specification(cls)
+        specification.is_satisfied_by(submission, table_name)
+        elapsed: float = time.perf_counter() - started
+
+        for finding in specification.messages.findings:
+            finding.table = finding.table or table_name
+
+        if key:
+            self.cache.store(key, asdict(specification.messages))
+
+        return specification.messages, SpecificationTiming(cls.__name__, table_name, elapsed)
+
+    def get_specification(self, cls: type[SpecificationBase]) -> SpecificationBase:
+        """Returns the instance of `cls` used by the current thread, with new (empty) messages. Instances are reused
+        so that state cached by a specification (e.g. `get_columns`) is kept between jobs."""
+        specifications: dict[type[SpecificationBase], SpecificationBase] = self.local.__dict__.setdefault(
+            "specifications", {}
+        )
+        if cls not in specifications:
+            specifications[cls] = cls(self.metadata, messages=None, ignore_columns=self.ignore_columns)
+        specification: SpecificationBase = specifications[cls]
+        specification.messages = SpecificationMessages()
+        return specification
+
+    def table_hash(self, submission: Submission, table_name: str) -> str | None:
+        with self.lock:
+            if table_name in self.table_hashes:
+                return self.table_hashes[table_name]
+        table_hash: str | None = hash_data_frame(submission.data_tables.get(table_name))
+        with self.lock:
+            return self.table_hashes.setdefault(table_name, table_hash)
+
+    def job_key(self, submission: Submission, cls: type[SpecificationBase], table_name: str) -> str | None:
+        """Returns a cache key for a (specification, table) job, or None if the job can't be cached.
+        The key is based on the table's content (all tables if the specification reads other tables), the metadata
+        fingerprint, the ignored columns and the specification's version (i.e. the source code of its module)."""
+        table_names: list[str] = sorted(submission.data_tables) if cls.reads_other_tables else [table_name]
+        table_hashes: list[str | None] = [self.table_hash(submission, x) for x in table_names]
+        if any(x is None for x in table_hashes):
+            return None
+        parts: list[str] = [
+            specification_version(cls),
+            table_name,
+            *[f"{x}={y}" for x, y in zip(table_names, table_hashes)],
+            self.metadata.fingerprint,
+            hash_config(sorted(self.ignore_columns)),
+        ]
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def timing_summary(self) -> list[dict[str, str | int | float]]:
+        """Returns total elapsed time, number of tables and the slowest table per rule, slowest rule first."""
+        rules: dict[str, list[SpecificationTiming]] = {}
+        for timing in self.timings:
+            rules.setdefault(timing.rule, []).append(timing)
+        summary: list[dict[str, str | int | float]] = []
+        for rule, timings in rules.items():
+            slowest: SpecificationTiming = max(timings, key=lambda x: x.elapsed)
+            summary.append(
+                {
+                    "rule": rule,
+                    "elapsed": sum(x.elapsed for x in timings),
+                    "tables": len(timings),
+                    "cached": sum(x.cached for x in timings),
+                    "slowest_table": slowest.table,
+                    "slowest_elapsed": slowest.elapsed,
+                }
+            )
+        return sorted(summary, key=lambda x: x["elapsed"], reverse=True)
+
+    def log_timings(self) -> None:
+        if not self.timings:
+            return
+        lines: list[str] = [f"{'rule':<50} {'total (s)':>10} {'tables':>7} {'cached':>7}  slowest table (s)"]
+        for x in self.timing_summary():
+            lines.append(
+                f"{x['rule']:<50} {x['elapsed']:>10.3f} {x['tables']:>7} {x['cached']:>7}"
+                f"  {x['slowest_table']} ({x['slowest_elapsed']:.3f})"
+            )
+        logger.info("specification timings:\n" + "\n".join(lines))
+
     def log_messages(self) -> None:
         for message in self.errors:
             logger.error(message)
@@ -144,6 +434,8 @@ class SubmissionSpecification(SpecificationBase):
 class SubmissionTableExistsSpecification(SpecificationBase):
     """Specification class that tests if table exists in submission"""
 
+    stage: SpecificationStage = SpecificationStage.STRUCTURAL
+
     def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
         if table_name not in submission:
             self.error(f"Table '{table_name}' not defined as submission table")
@@ -151,6 +443,8 @@ class SubmissionTableExistsSpecification(SpecificationBase):
 
 @SpecificationRegistry.register()
 class ColumnTypesSpecification(SpecificationBase):
+    stage: SpecificationStage = SpecificationStage.TYPE
+
     TYPE_COMPATIBILITY_MATRIX: set[tuple[str, str]] = {
         ("bigint", "int64"),
         ("character varying", "object"),
@@ -176,19 +470,49 @@ class ColumnTypesSpecification(SpecificationBase):
             """Cannot determine type if table is empty"""
             return
 
+        profile: TableProfile = submission.get_profile(table_name)
         for column in self.get_columns(table_name):
             if column.column_name not in data_table.columns:
                 continue
-            data_column_type: str = data_table.dtypes[column.column_name].name
-            if all(data_table[column.column_name].isna()):
+            data_column_type: str = profile.dtypes[column.column_name]
+            if profile.all_null(column.column_name):
                 continue
             if (column.data_type.lower(), data_column_type.lower()) not in self.TYPE_COMPATIBILITY_MATRIX:
-                self.warn(f"type clash: {table_name}.{column.column_name} {column.data_type}<=>{data_column_type}")
+                self.warn(
+                    f"type clash: {table_name}.{column.column_name} {column.data_type}<=>{data_column_type}",
+                    column=column.column_name,
+                )
 
 
 @SpecificationRegistry.register()
 class SubmissionTableTypesSpecification(SpecificationBase):
+    stage: SpecificationStage = SpecificationStage.TYPE
+
     NUMERIC_TYPES: list[str] = ["numeric", "integer", "smallint"]
+    REAL_INFERRED_TYPES: set[str] = {"empty", "integer", "floating", "mixed-integer-float", "decimal", "boolean"}
+    TEXT_INFERRED_TYPES: set[str] = {"string", "bytes"}
+    MAX_REPORTED_POSITIONS: int = 20
+
+    @staticmethod
+    def non_numeric_mask(series: pd.Series) -> np.ndarray:
+        """Returns a mask of values that aren't real numbers, i.e. values for which `np.isreal` is False.
+        Columns with numeric dtypes or an inferred numeric type are accepted without inspecting values."""
+        if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_complex_dtype(series.dtype):
+            return np.zeros(len(series), dtype=bool)
+
+        inferred_type: str = pd.api.types.infer_dtype(series, skipna=True)
+        if inferred_type in SubmissionTableTypesSpecification.REAL_INFERRED_TYPES:
+            return np.zeros(len(series), dtype=bool)
+        if inferred_type in SubmissionTableTypesSpecification.TEXT_INFERRED_TYPES:
+            return np.ones(len(series), dtype=bool)
+
+        values: np.ndarray = series.to_numpy(dtype=object)
+        types: pd.Series = pd.Series(np.fromiter(map(type, values), dtype=object, count=len(values)))
+        mask: np.ndarray = types.isin([str, bytes, np.str_, np.bytes_]).to_numpy()
+        is_complex: np.ndarray = types.isin([complex, np.complex64, np.complex128]).to_numpy()
+        if is_complex.any():
+            mask[is_complex] = np.imag(values[is_complex].astype(complex)) != 0
+        return mask
 
     def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
         data_table: pd.DataFrame = submission.data_tables[table_name]
@@ -200,15 +524,31 @@ class SubmissionTableTypesSpecification(SpecificationBase):
                 continue
 
             series: pd.Series = data_table[column.column_name]
-            series = series[~series.isna()]
-            ok_mask: pd.Series = series.apply(np.isreal)
-            if not ok_mask.all():
-                error_values = " ".join(list(set(series[~ok_mask])))[:200]
-                self.error(f"Column '{table_name}.{column.column_name}' has non-numeric values: '{error_values}'")
+            not_null: np.ndarray = series.notna().to_numpy()
+            series = series[not_null]
+            error_mask: np.ndarray = self.non_numeric_mask(series)
+            if error_mask.any():
+                positions: np.ndarray = np.flatnonzero(not_null)[error_mask]
+                error_values = " ".join(map(str, set(series[error_mask])))[:200]
+                self.error(
+                    f"Column '{table_name}.{column.column_name}' has non-numeric values: '{error_values}'",
+                    column=column.column_name,
+                    rows=positions,
+                )
+
+                reported: str = ", ".join(map(str, positions[: self.MAX_REPORTED_POSITIONS]))
+                ellipsis: str = " ..." if len(positions) > self.MAX_REPORTED_POSITIONS else ""
+                self.info(
+                    f"Column '{table_name}.{column.column_name}' has {len(positions)} non-numeric value(s) "
+                    f"at row position(s): {reported}{ellipsis}",
+                    column=column.column_name,
+                )
 
 
 @SpecificationRegistry.register()
 class HasPrimaryKeySpecification(SpecificationBase):
+    stage: SpecificationStage = SpecificationStage.STRUCTURAL
+
     def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
         data_table: pd.DataFrame = submission.data_tables[table_name]
         if self.metadata[table_name].pk_name not in data_table.columns:
@@ -222,6 +562,8 @@ class HasPrimaryKeySpecification(SpecificationBase):
 
 @SpecificationRegistry.register()
 class HasSystemIdSpecification(SpecificationBase):
+    stage: SpecificationStage = SpecificationStage.STRUCTURAL
+
     def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
         # Must have a system identity
         # if not submission.has_system_id(table_name):
@@ -231,8 +573,16 @@ class HasSystemIdSpecification(SpecificationBase):
             self.error(f"Table {table_name} has no system id data column")
             return
 
-        if data_table.system_id.isnull().values.any():
-            self.error(f"Table {table_name} has missing system id values")
+        profile: TableProfile = submission.get_profile(table_name)
+        if profile.any_null("system_id"):
+            self.error(
+                f"Table {table_name} has missing system id values",
+                column="system_id",
+                rows=np.flatnonzero(data_table.system_id.isnull().to_numpy()),
+            )
+
+        if profile.is_unique("system_id"):
+            return
 
         try:
             # duplicate_mask = data_table[~data_table.system_id.isna()].duplicated('system_id')
@@ -240,13 +590,19 @@ class HasSystemIdSpecification(SpecificationBase):
             duplicates: list[int] = [int(x) for x in set(data_table[duplicate_mask].system_id)]
             if len(duplicates) > 0:
                 error_values: str = " ".join([str(x) for x in duplicates])[:200]
-                self.error(f"Table {table_name} has DUPLICATE system ids: {error_values}")
+                self.error(
+                    f"Table {table_name} has DUPLICATE system ids: {error_values}",
+                    column="system_id",
+                    rows=np.flatnonzero(duplicate_mask.to_numpy()),
+                )
         except Exception as _:
             self.warn(f"Duplicate check of {table_name}.system_id failed")
 
 
 @SpecificationRegistry.register()
 class IdColumnHasConstraintSpecification(SpecificationBase):
+    stage: SpecificationStage = SpecificationStage.STRUCTURAL
+
     def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
         for column in self.get_columns(table_name):
             if column.column_name[-3:] == "_id" and not (column.is_fk or column.is_pk):
@@ -255,6 +611,8 @@ class IdColumnHasConstraintSpecification(SpecificationBase):
 
 @SpecificationRegistry.register()
 class ForeignKeyColumnsHasValuesSpecification(SpecificationBase):
+    stage: SpecificationStage = SpecificationStage.INTEGRITY
+
     def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
         """Foreign key columns must have values"""
         data_table: pd.DataFrame = submission.data_tables[table_name]
@@ -266,6 +624,8 @@ class ForeignKeyColumnsHasValuesSpecification(SpecificationBase):
             if not submission.has_new_rows(table_name):
                 return
 
+        profile: TableProfile = submission.get_profile(table_name)
+
         for column in self.get_columns(table_name):
 
             if not column.is_fk:
@@ -273,23 +633,37 @@ class ForeignKeyColumnsHasValuesSpecification(SpecificationBase):
 
             if column.column_name not in data_table.columns:
                 if not column.is_nullable:
-                    self.error(f"Foreign key column '{table_name}.{column.column_name}' not in data")
+                    self.error(
+                        f"Foreign key column '{table_name}.{column.column_name}' not in data", column.column_name
+                    )
                 else:
-                    self.info(f"Foreign key column '{table_name}.{column.column_name}' not in data (but is nullable)")
+                    self.info(
+                        f"Foreign key column '{table_name}.{column.column_name}' not in data (but is nullable)",
+                        column.column_name,
+                    )
                 continue
 
-            has_nan: bool = data_table[column.column_name].isnull().values.any()
-            all_nan: bool = data_table[column.column_name].isnull().values.all()
+            has_nan: bool = profile.any_null(column.column_name)
+            all_nan: bool = profile.all_null(column.column_name)
 
             if all_nan and not column.is_nullable:
-                self.error(f"Foreign key column '{table_name}.{column.column_name}' has no values")
+                self.error(f"Foreign key column '{table_name}.{column.column_name}' has no values", column.column_name)
 
             if has_nan and not column.is_nullable:
-                self.error(f"Non-nullable foreign key column '{table_name}.{column.column_name}' has missing values")
+                self.error(
+                    f"Non-nullable foreign key column '{table_name}.{column.column_name}' has missing values",
+                    column=column.column_name,
+                    rows=np.flatnonzero(data_table[column.column_name].isnull().to_numpy()),
+                )
 
 
 @SpecificationRegistry.register()
 class ForeignKeyExistsAsPrimaryKeySpecification(SpecificationBase):
+    stage: SpecificationStage = SpecificationStage.INTEGRITY
+    reads_other_tables: bool = True
+
+    MAX_SAMPLE_KEYS: int = 10
+
     def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
         """All submission tables MUST have a non null "system_id" """
         data_table: pd.DataFrame = submission.data_tables[table_name]
@@ -312,7 +686,7 @@ class ForeignKeyExistsAsPrimaryKeySpecification(SpecificationBase):
                     self.error(f"Foreign key column '{table_name}.{column.column_name}' not in data")
                 continue
 
-            fk_has_data: bool = not data_table[column.column_name].isnull().all()
+            fk_has_data: bool = not submission.get_profile(table_name).all_null(column.column_name)
 
             fk_table_name: str = column.fk_table_name
             if fk_table_name not in submission.data_tables:
@@ -327,18 +701,101 @@ class ForeignKeyExistsAsPrimaryKeySpecification(SpecificationBase):
             fk_table: Table = self.metadata[fk_table_name]
             if fk_table.is_lookup:
                 continue
-            # fk_table: pd.DataFrame = submission.data_tables[fk_table_name]
-            # if fk_table is None:
-            #     self.warn(f"ERROR Table {fk_table_name} referenced as FK in data by {table_name} but not found in submission.")
-            #     continue
-            # if not fk_system_id.isin(fk_table.system_id).all():
-            #     self.warn(
-            #         f"ERROR FK value {table_name}.{column_spec.column_name} has values not found as PK in {fk_table_name}"
-            #     )
+
+            self.check_referential_integrity(submission, table_name, column.column_name, fk_table_name)
+
+    def check_referential_integrity(
+        self, submission: Submission, table_name: str, column_name: str, fk_table_name: str
+    ) -> None:
+        """FK values must be numeric, and exist as system_id in the referenced table (vectorized hash lookup)"""
+        fk_values: pd.Series = self.to_keys(
+            table_name, column_name, submission.data_tables[table_name][column_name], self.MAX_SAMPLE_KEYS
+        )
+        dangling_mask: pd.Series = fk_values.notna() & ~fk_values.isin(submission.get_system_id_index(fk_table_name))
+        if not dangling_mask.any():
+            return
+
+        dangling: pd.Series = fk_values[dangling_mask]
+
+        keys: np.ndarray = np.sort(dangling.unique())
+        sample: str = ", ".join(str(int(x)) if x.is_integer() else str(x) for x in keys[: self.MAX_SAMPLE_KEYS])
+        ellipsis: str = " ..." if len(keys) > self.MAX_SAMPLE_KEYS else ""
+        self.warn(
+            f"Foreign key '{table_name}.{column_name}' has {len(dangling)} value(s) ({len(keys)} distinct) "
+            f"not found as system_id in '{fk_table_name}': {sample}{ellipsis}",
+            column=column_name,
+            rows=np.flatnonzero(dangling_mask.to_numpy()),
+        )
+
+
+@SpecificationRegistry.register()
+class PublicIdExistsInSeadSpecification(SpecificationBase):
+    """Public ids, i.e. PK values > 0 and values of FKs to tables not in the submission, must exist in SEAD.
+    All public ids in the table are checked in a single batched query (see `Metadata.find_primary_keys`)."""
+
+    stage: SpecificationStage = SpecificationStage.INTEGRITY
+    reads_other_tables: bool = True
+    cacheable: bool = False
+    MAX_SAMPLE_KEYS: int = 10
+
+    def get_references(self, submission: Submission, table_name: str) -> list[tuple[str, str]]:
+        """Returns (column, referenced table) for columns in `table_name` that hold public ids."""
+        data_table: pd.DataFrame = submission.data_tables[table_name]
+        table: Table = self.metadata[table_name]
+        references: list[tuple[str, str]] = []
+        if table.pk_name in data_table.columns:
+            references.append((table.pk_name, table_name))
+        for column in self.get_columns(table_name):
+            if (
+                column.is_fk
+                and column.column_name in data_table.columns
+                and column.fk_table_name not in submission.data_tables
+                and column.fk_table_name in self.metadata
+            ):
+                references.append((column.column_name, column.fk_table_name))
+        return references
+
+    def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
+        data_table: pd.DataFrame = submission.data_tables[table_name]
+        if len(data_table) == 0 or table_name not in self.metadata:
+            return
+
+        public_ids: dict[tuple[str, str], pd.Series] = {}
+        for column_name, referenced_table_name in self.get_references(submission, table_name):
+            values: pd.Series = self.to_keys(table_name, column_name, data_table[column_name], self.MAX_SAMPLE_KEYS)
+            if (values > 0).any():
+                public_ids[(column_name, referenced_table_name)] = values
+
+        if not public_ids:
+            return
+
+        keys: dict[str, set[int]] = {}
+        for (_, referenced_table_name), values in public_ids.items():
+            keys.setdefault(referenced_table_name, set()).update(int(x) for x in values[values > 0].unique())
+
+        existing_keys: dict[str, set[int]] = self.metadata.find_primary_keys(keys)
+
+        for (column_name, referenced_table_name), values in public_ids.items():
+            missing_mask: np.ndarray = (
+                (values > 0) & ~values.isin(existing_keys.get(referenced_table_name, set()))
+            ).to_numpy()
+            if not missing_mask.any():
+                continue
+            missing_keys: np.ndarray = np.sort(values[missing_mask].unique())
+            sample: str = ", ".join(str(int(x)) for x in missing_keys[: self.MAX_SAMPLE_KEYS])
+            ellipsis: str = " ..." if len(missing_keys) > self.MAX_SAMPLE_KEYS else ""
+            self.error(
+                f"Table {table_name}: {int(missing_mask.sum())} public id(s) in column {column_name} not found "
+                f"in SEAD table {referenced_table_name}: {sample}{ellipsis}",
+                column=column_name,
+                rows=np.flatnonzero(missing_mask),
+            )
 
 
 @SpecificationRegistry.register()
 class NoMissingColumnSpecification(SpecificationBase):
+    stage: SpecificationStage = SpecificationStage.STRUCTURAL
+
     def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
         """All fields in metadata.Table.Fields MUST exist in DataTable.columns"""
 
@@ -383,6 +840,8 @@ class NoMissingColumnSpecification(SpecificationBase):
 
 @SpecificationRegistry.register()
 class NonNullableColumnHasValueSpecification(SpecificationBase):
+    stage: SpecificationStage = SpecificationStage.INTEGRITY
+
     def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
         """
         Checks that non-nullable columns have values.
@@ -405,18 +864,30 @@ class NonNullableColumnHasValueSpecification(SpecificationBase):
             and x != "system_id"
         }
 
-        new_records: pd.DataFrame = data[~(data[table.pk_name] > 0) | data[table.pk_name].isnull()]
+        profile: TableProfile = submission.get_profile(table_name)
+        non_nullable_columns = {x for x in non_nullable_columns if profile.any_null(x)}
+        if not non_nullable_columns:
+            return
+
+        new_mask: np.ndarray = (~(data[table.pk_name] > 0) | data[table.pk_name].isnull()).to_numpy(dtype=bool)
 
-        if len(new_records) == 0:
+        if not new_mask.any():
             return
 
         for column_name in non_nullable_columns:
-            if new_records[column_name].isnull().any():
-                self.error(f"Table {table_name} has NULL values in non-nullable column {column_name}")
+            rows: np.ndarray = np.flatnonzero(new_mask & data[column_name].isnull().to_numpy())
+            if len(rows) > 0:
+                self.error(
+                    f"Table {table_name} has NULL values in non-nullable column {column_name}",
+                    column=column_name,
+                    rows=rows,
+                )
 
 
 # DISABLED: @SpecificationRegistry.register()
 class NewLookupDataIsNotAllowedSpecification(SpecificationBase):
+    stage: SpecificationStage = SpecificationStage.INTEGRITY
+
     DISABLED: bool = True
 
     def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
@@ -446,6 +917,8 @@ class NewLookupDataIsNotAllowedSpecification(SpecificationBase):
 class KeyedByTableNameSpecification(SpecificationBase):
     """Verify that `table_name` is a SEAD table (and not an Excel abbreviated sheet name)"""
 
+    stage: SpecificationStage = SpecificationStage.STRUCTURAL
+
     @cached_property
     def aliased_table_names(self) -> set[str]:
         return {t.excel_sheet for t in self.metadata.sead_schema.aliased_tables}
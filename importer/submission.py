@@ -3,12 +3,18 @@ from __future__ import annotations
 import contextlib
 import functools
 import os
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any
 
 import pandas as pd
 from loguru import logger
 
+from .cache import SubmissionCache
+from .configuration.inject import ConfigValue
 from .metadata import Metadata, SeadSchema
-from .policies import UpdatePolicies
+from .policies import PolicyRunner, PolicyStatistics
 from .utility import flatten_sets, log_decorator, to_lookups_sql
 
 
@@ -17,12 +23,117 @@ def load_excel_sheet(reader: pd.ExcelFile, sheetname: str) -> pd.DataFrame:
         return reader.parse(sheetname)
 
 
+@dataclass
+class ColumnProfile:
+    dtype: str
+    row_count: int
+    null_count: int
+    min: Any
+    max: Any
+    is_unique: bool
+
+    @property
+    def any_null(self) -> bool:
+        return self.null_count > 0
+
+    @property
+    def all_null(self) -> bool:
+        return self.null_count == self.row_count
+
+
+class TableProfile:
+    """Facts about a table's columns. Null counts and numeric min/max are computed for all columns in a single
+    vectorized pass the first time any of them is used, uniqueness is computed (and cached) per column."""
+
+    def __init__(self, data: pd.DataFrame) -> None:
+        self.data: pd.DataFrame = data
+        self.shape: tuple = TableProfile.get_shape(data)
+        self.unique_flags: dict[str, bool] = {}
+
+    @staticmethod
+    def get_shape(data: pd.DataFrame) -> tuple:
+        """Returns the number of rows and the columns and dtypes of `data` (changes made to values are not included)."""
+        return (len(data), tuple(data.columns), tuple(data.dtypes))
+
+    def is_stale(self, data: pd.DataFrame) -> bool:
+        """True if the profile isn't computed from `data`, or if rows, columns or dtypes have changed since."""
+        return self.data is not data or self.shape != TableProfile.get_shape(data)
+
+    @cached_property
+    def row_count(self) -> int:
+        return len(self.data)
+
+    @cached_property
+    def dtypes(self) -> dict[str, str]:
+        return {k: v.name for k, v in self.data.dtypes.items()}
+
+    @cached_property
+    def statistics(self) -> pd.DataFrame:
+        """Null count, min and max (None for non-numeric columns) of each column."""
+        numerics: pd.DataFrame = self.data.select_dtypes(include="number")
+        ranges: pd.DataFrame = (
+            numerics.agg(['min', 'max']).astype(object).T
+            if len(numerics.columns) > 0
+            else pd.DataFrame(columns=['min', 'max'])
+        )
+        statistics: pd.DataFrame = pd.DataFrame({'null_count': self.data.isna().sum()}).join(ranges).astype(object)
+        return statistics.where(statistics.notna(), None)
+
+    @cached_property
+    def null_counts(self) -> dict[str, int]:
+        return {k: int(v) for k, v in self.statistics['null_count'].items()}
+
+    @cached_property
+    def minimums(self) -> dict[str, Any]:
+        return self.statistics['min'].to_dict()
+
+    @cached_property
+    def maximums(self) -> dict[str, Any]:
+        return self.statistics['max'].to_dict()
+
+    def null_count(self, column_name: str) -> int:
+        return self.null_counts[column_name]
+
+    def any_null(self, column_name: str) -> bool:
+        return self.null_counts[column_name] > 0
+
+    def all_null(self, column_name: str) -> bool:
+        return self.null_counts[column_name] == self.row_count
+
+    def is_unique(self, column_name: str) -> bool:
+        """True if the column has no duplicate values (missing values count as equal)"""
+        if column_name not in self.unique_flags:
+            self.unique_flags[column_name] = bool(self.data[column_name].is_unique)
+        return self.unique_flags[column_name]
+
+    def __getitem__(self, column_name: str) -> ColumnProfile:
+        return ColumnProfile(
+            dtype=self.dtypes[column_name],
+            row_count=self.row_count,
+            null_count=self.null_counts[column_name],
+            min=self.minimums[column_name],
+            max=self.maximums[column_name],
+            is_unique=self.is_unique(column_name),
+        )
+
+
 class Submission:
     """Logic dealing with the submission data"""
 
     def __init__(self, data_tables: dict[str, pd.DataFrame], metadata: Metadata) -> None:
         self.data_tables: dict[str, pd.DataFrame] = data_tables
         self.metadata: Metadata = metadata
+        self.policy_statistics: list[PolicyStatistics] = []
+        self.system_id_indexes: dict[str, tuple[pd.DataFrame, pd.Index]] = {}
+        self.profiles: dict[str, TableProfile] = {}
+        self.lock: threading.RLock = threading.RLock()
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {k: v for k, v in self.__dict__.items() if k != "lock"}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
 
     def __getitem__(self, key: str) -> pd.DataFrame:
         if key in self.data_tables:
@@ -53,7 +164,43 @@ class Submission:
         pk_name: str = self.metadata[table_name].pk_name
         if not self.has_pk_id(table_name):
             raise ValueError(f"Table {table_name}: PK column {pk_name} not found in submission")
-        return any(self[table_name][pk_name].isnull())
+        return self.get_profile(table_name).any_null(pk_name)
+
+    def get_profile(self, table_name: str) -> TableProfile:
+        """Returns the (lazily computed) column profile of `table_name`. The profile is recreated if the table has been
+        replaced, or if its rows, columns or dtypes have changed. Use `invalidate_profile` if values change in place."""
+        data_table: pd.DataFrame = self[table_name]
+        with self.lock:
+            profile: TableProfile | None = self.profiles.get(table_name)
+            if profile is None or profile.is_stale(data_table):
+                profile = self.profiles[table_name] = TableProfile(data_table)
+            return profile
+
+    def invalidate_profile(self, table_name: str = None) -> None:
+        """Discards the profile of `table_name` (all profiles if None). Call it if values are changed in place."""
+        with self.lock:
+            if table_name is None:
+                self.profiles.clear()
+            else:
+                self.profiles.pop(table_name, None)
+
+    def get_system_id_index(self, table_name: str) -> pd.Index:
+        """Returns the unique (numeric) system ids in `table_name` as a hashed index, suitable for `isin` lookups.
+        The index is cached, and recreated if the table has been replaced."""
+        data_table: pd.DataFrame = self.data_tables.get(table_name)
+        with self.lock:
+            cached: tuple[pd.DataFrame, pd.Index] | None = self.system_id_indexes.get(table_name)
+        if cached is not None and cached[0] is data_table:
+            return cached[1]
+        system_ids: pd.Series = (
+            pd.to_numeric(data_table["system_id"], errors="coerce").dropna()
+            if data_table is not None and "system_id" in data_table.columns
+            else pd.Series([], dtype="float64")
+        )
+        index: pd.Index = pd.Index(system_ids.astype("float64").unique())
+        with self.lock:
+            self.system_id_indexes[table_name] = (data_table, index)
+        return index
 
     @property
     def data_table_names(self) -> list[str]:
@@ -80,18 +227,58 @@ class Submission:
         ]
         return set(int(x) for x in functools.reduce(flatten_sets, referenced_pk_ids or [], []))
 
+    def get_referenced_keysets(self, metadata: Metadata) -> dict[str, set[int]]:
+        """Returns referenced system ids for every table that is referenced by a foreign key in the submission.
+        The foreign keys are scanned in a single pass, i.e. independent of the number of tables in the SEAD schema.
+        NOTE: This function assumes PK and FK names are the same (see `get_referenced_keyset`)."""
+        foreign_keys: pd.DataFrame = metadata.foreign_keys
+        references: pd.DataFrame = foreign_keys.loc[foreign_keys.table_name.isin(self.data_tables.keys())][
+            ['table_name', 'fk_table_name']
+        ].drop_duplicates()
+
+        keysets: dict[str, set[int]] = {}
+        for table_name, fk_table_name in references.itertuples(index=False):
+            if fk_table_name not in metadata:
+                continue
+            pk_name: str = metadata[fk_table_name].pk_name
+            if pk_name is None or pk_name not in self.data_tables[table_name].columns:
+                continue
+            series: pd.Series = self.data_tables[table_name][pk_name]
+            keysets.setdefault(fk_table_name, set()).update(int(x) for x in series.dropna().unique())
+        return keysets
+
     @log_decorator(enter_message=' --> loading excel...', exit_message=' --> done loading excel', level='DEBUG')
     @staticmethod
-    def load(*, metadata: Metadata, source: str | pd.ExcelFile, apply_policies: bool = True) -> "Submission":
-        """Loads the submission file into a SubmissionData object"""
+    def load(
+        *, metadata: Metadata, source: str | pd.ExcelFile, apply_policies: bool = True, cache_folder: str = None
+    ) -> "Submission":
+        """Loads the submission file into a SubmissionData object.
+        If `cache_folder` is given, post-policy data tables are cached and reused for an unchanged workbook."""
+
+        cache: SubmissionCache = (
+            SubmissionCache(cache_folder, metadata)
+            if cache_folder and apply_policies and isinstance(source, str)
+            else None
+        )
+        cache_key: str = cache.key(source) if cache else None
+
+        if cache and ConfigValue("options:policy_report").resolve():
+            logger.info("   policy report requested, ignoring cached post-policy submission")
+        elif cache:
+            data_tables: dict[str, pd.DataFrame] = cache.load(cache_key)
+            if data_tables is not None:
+                logger.info(f"   using cached post-policy submission {cache_key[:12]}")
+                return Submission(data_tables, metadata)
 
         data_tables: dict[str, pd.DataFrame] = Submission.load_data_tables(source, metadata.sead_schema)
 
         submission: Submission = Submission(data_tables, metadata)
 
         if apply_policies:
-            for policy in UpdatePolicies.get_sorted_items():
-                policy(metadata, submission).apply()
+            PolicyRunner(metadata, submission).run()
+
+        if cache:
+            cache.store(cache_key, submission.data_tables)
 
         return submission
 
@@ -11,7 +11,7 @@ import pandas as pd
 from loguru import logger
 from sqlalchemy.types import TEXT
 
-from ..utility import Registry, get_connection_uri
+from ..utility import Registry, get_connection_uri, open_compressed, strip_compression_extension
 
 Table = namedtuple("Table", "table_type, record_count")
 
@@ -47,7 +47,10 @@ def format_value(value: str, data_type: str) -> str:
 
 
 def load_xml(source: str) -> ET.ElementTree | ET.Element | Any:
-    return ET.fromstring(source) if '<' in source else ET.parse(source).getroot()
+    if '<' in source:
+        return ET.fromstring(source)
+    with open_compressed(source, "rb") as fp:
+        return ET.parse(fp).getroot()
 
 
 @Parsers.register(key=Table)
@@ -120,7 +123,7 @@ def xml_to_records(source: str) -> Iterable[Record]:
 
 
 def xml_to_csv(xml_filename: str, csv_folder: str, iter_fn: Iterable[Any], iter_type: DbType) -> str:
-    basename: str = os.path.splitext(os.path.basename(xml_filename))[0]
+    basename: str = os.path.splitext(os.path.basename(strip_compression_extension(xml_filename)))[0]
     filename: str = os.path.join(csv_folder, f"{basename}_{iter_type.__name__.lower()}s.csv")
     with open(filename, 'w') as f:
         f.write('\t'.join(iter_type._fields) + '\n')
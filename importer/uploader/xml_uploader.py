@@ -1,11 +1,10 @@
-import io
 import os
 from typing import Any
 
 from loguru import logger
 from psycopg2.extensions import connection as Connection
 
-from ..utility import log_decorator
+from ..utility import log_decorator, open_compressed
 from . import BaseUploader, Uploaders
 
 
@@ -18,7 +17,7 @@ class XmlUploader(BaseUploader):
 
     @log_decorator(enter_message=" ---> uploading XML...", exit_message=" ---> XML uploaded", level="DEBUG")
     def upload(self, connection: Connection, xml_filename: str | Any, submission_id: int) -> None:
-        """Upload processed XML submission file to database."""
+        """Upload processed XML submission file (optionally .gz or .zst compressed) to database."""
         if xml_filename is None:
             raise ValueError("Either xml or filename must be provided")
 
@@ -30,7 +29,7 @@ class XmlUploader(BaseUploader):
         else:
             if not os.path.exists(xml_filename):
                 raise ValueError(f"XML file {xml_filename} does not exist")
-            with io.open(xml_filename, mode="r", encoding="utf-8") as f:
+            with open_compressed(xml_filename, mode="r", encoding="utf-8") as f:
                 xml: str = f.read()
 
         with connection.cursor() as cursor:
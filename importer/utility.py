@@ -3,17 +3,21 @@ from __future__ import annotations
 import base64
 import fnmatch
 import functools
+import gzip
 import importlib
+import importlib.util
 import io
 import os
 import re
+import shutil
 import sys
-import zlib
 from datetime import datetime
 from os.path import abspath, basename, dirname, join, splitext
-from typing import TYPE_CHECKING, Any, Callable, Literal
-from xml.dom import minidom
+from typing import IO, TYPE_CHECKING, Any, Callable, Iterable, Literal
+from xml.parsers import expat
+from xml.sax.saxutils import escape
 
+import numpy as np
 import pandas as pd
 import yaml
 from jinja2 import Environment, Template
@@ -271,14 +275,47 @@ def load_sead_data(db_uri: str, sql: str | pd.DataFrame, index: list[str], sortb
     return data
 
 
+class ColumnMatcher:
+    """Matches column names against fnmatch patterns, compiled into a single regular expression.
+    Match results are memoized, so each distinct column name is only matched once."""
+
+    def __init__(self, patterns: Iterable[str] = None) -> None:
+        self.patterns: tuple[str, ...] = tuple(patterns or ())
+        self.regex: re.Pattern | None = (
+            re.compile("|".join(f"(?:{fnmatch.translate(x)})" for x in self.patterns)) if self.patterns else None
+        )
+        self.memo: dict[str, bool] = {}
+
+    def match(self, column_name: str) -> bool:
+        if column_name not in self.memo:
+            self.memo[column_name] = self.regex is not None and self.regex.match(column_name) is not None
+        return self.memo[column_name]
+
+    def filter(self, column_names: Iterable[str]) -> list[str]:
+        """Returns column names that match any pattern."""
+        return [x for x in column_names if self.match(x)]
+
+    def exclude(self, column_names: Iterable[str]) -> list[str]:
+        """Returns column names that don't match any pattern."""
+        return [x for x in column_names if not self.match(x)]
+
+
+@functools.cache
+def _column_matcher(patterns: tuple[str, ...]) -> ColumnMatcher:
+    return ColumnMatcher(patterns)
+
+
+def column_matcher(patterns: Iterable[str] = None) -> ColumnMatcher:
+    """Returns a shared matcher for `patterns`, i.e. the same matcher (and memo) is used for equal patterns."""
+    return _column_matcher(tuple(patterns or ()))
+
+
 def load_sead_columns(db_uri: str, ignore_columns: list[str] = None) -> pd.DataFrame:
     """Returns a dataframe of table columns from SEAD with attributes."""
     sql: str = "select * from clearing_house.clearinghouse_import_columns"
     data: pd.DataFrame = load_sead_data(db_uri, sql, ["table_name", "column_name"], ["table_name", "position"])
     if ignore_columns:
-        columns_to_ignore: list[str] = [
-            c for c in data['column_name'].unique() if any(fnmatch.fnmatch(c, pattern) for pattern in ignore_columns)
-        ]
+        columns_to_ignore: list[str] = column_matcher(ignore_columns).filter(data['column_name'].unique())
         data = data[~data['column_name'].isin(columns_to_ignore)]
 
     return data
@@ -298,20 +335,171 @@ def flatten_sets(x, y) -> set:
     return set(list(x) + list(y))
 
 
+def nullable_dtype(dtype: Any) -> Any:
+    """Returns a dtype that can hold missing values, i.e. the pandas nullable type for numpy integers and booleans."""
+    dtype = pd.api.types.pandas_dtype(dtype)
+    if dtype.kind in "iu" and isinstance(dtype, np.dtype):
+        return pd.api.types.pandas_dtype(dtype.name.capitalize().replace("Uint", "UInt"))
+    if dtype.kind == "b" and isinstance(dtype, np.dtype):
+        return pd.BooleanDtype()
+    return dtype
+
+
 def camel_case_name(undescore_name: str) -> str:
     first, *rest = undescore_name.split("_")
     return first + "".join(word.capitalize() for word in rest)
 
 
+COMPRESSION_EXTENSIONS: dict[str, str] = {"gzip": ".gz", "zstd": ".zst"}
+
+# Compressions that depend on an optional package (pip install zstandard)
+COMPRESSION_PACKAGES: dict[str, str] = {"zstd": "zstandard"}
+
+
+def available_compressions() -> list[str]:
+    """Returns the compressions that can be used, i.e. excluding those whose optional package isn't installed."""
+    return [
+        compression
+        for compression in COMPRESSION_EXTENSIONS
+        if compression not in COMPRESSION_PACKAGES
+        or importlib.util.find_spec(COMPRESSION_PACKAGES[compression]) is not None
+    ]
+
+
+def get_compression(filename: str) -> str | None:
+    """Returns the compression ("gzip" or "zstd") implied by the filename's extension, or None."""
+    for compression, extension in COMPRESSION_EXTENSIONS.items():
+        if filename.endswith(extension):
+            return compression
+    return None
+
+
+def strip_compression_extension(filename: str) -> str:
+    compression: str | None = get_compression(filename)
+    return filename[: -len(COMPRESSION_EXTENSIONS[compression])] if compression else filename
+
+
+def is_xml_filename(filename: str) -> bool:
+    """Returns True if filename is an XML file, optionally compressed (.xml, .xml.gz or .xml.zst)."""
+    return strip_compression_extension(filename).endswith(".xml")
+
+
+def open_compressed(filename: str, mode: str = "r", encoding: str = "utf-8") -> IO:
+    """Opens a file for streaming I/O, (de)compressing on the fly if filename ends with .gz or .zst.
+    The file is opened in text mode unless mode contains "b"."""
+    compression: str | None = get_compression(filename)
+    if "b" in mode:
+        encoding = None
+    elif "t" not in mode and compression is not None:
+        mode += "t"
+
+    if compression == "gzip":
+        return gzip.open(filename, mode, compresslevel=6, encoding=encoding)
+
+    if compression == "zstd":
+        try:
+            import zstandard  # pylint: disable=import-outside-toplevel
+        except ImportError as ex:
+            raise ImportError(f"{filename}: zstd compression requires the zstandard package") from ex
+        return zstandard.open(filename, mode, encoding=encoding)
+
+    return io.open(filename, mode, encoding=encoding)
+
+
+XML_INVALID_CHARS: re.Pattern = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+XML_TEXT_SPECIALS: re.Pattern = re.compile("[&<>\r\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+XML_ATTRIBUTE_SPECIALS: re.Pattern = re.compile("[&<>\"\t\n\r\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+XML_TEXT_ENTITIES: dict[str, str] = {"\r": "&#13;"}
+XML_ATTRIBUTE_ENTITIES: dict[str, str] = {'"': "&quot;", "\t": "&#9;", "\n": "&#10;", "\r": "&#13;"}
+
+REPLACEMENT_CHARACTER: str = "\ufffd"
+
+
+def escape_text(value: str) -> str:
+    """Escapes element content. Characters that aren't allowed in XML 1.0 (e.g. control characters) are replaced
+    with U+FFFD, and carriage returns are written as references since parsers otherwise normalize them to newlines."""
+    if not XML_TEXT_SPECIALS.search(value):
+        return value
+    return escape(XML_INVALID_CHARS.sub(REPLACEMENT_CHARACTER, value), XML_TEXT_ENTITIES)
+
+
+def escape_attribute(value: str) -> str:
+    """Escapes a (double quoted) attribute value. Whitespace is written as references to survive normalization."""
+    if not XML_ATTRIBUTE_SPECIALS.search(value):
+        return value
+    return escape(XML_INVALID_CHARS.sub(REPLACEMENT_CHARACTER, value), XML_ATTRIBUTE_ENTITIES)
+
+
+class XmlIndenter:
+    """Re-indents an XML document while it is parsed by expat. No tree is built, so memory use is independent of
+    document size. Elements are written one per line, text-only elements on a single line. Whitespace-only text
+    is dropped, and comments and processing instructions are not kept."""
+
+    def __init__(self, outstream: IO, indent: str = "  ", lines_per_write: int = 10000) -> None:
+        self.outstream: IO = outstream
+        self.indent: str = indent
+        self.lines_per_write: int = lines_per_write
+        self.lines: list[str] = ['<?xml version="1.0" encoding="UTF-8"?>']
+        self.depth: int = 0
+        self.pending: str | None = None
+        self.text: str = ""
+
+    def parse(self, instream: IO) -> None:
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.ordered_attributes = True
+        parser.StartElementHandler = self.start
+        parser.EndElementHandler = self.end
+        parser.CharacterDataHandler = self.data
+        parser.ParseFile(instream)
+        self.write()
+
+    def write(self) -> None:
+        self.outstream.write("\n".join(self.lines) + "\n")
+        self.lines.clear()
+
+    def pop_text(self) -> str:
+        text: str = self.text
+        self.text = ""
+        return "" if not text or text.isspace() else escape_text(text)
+
+    def start(self, tag: str, attributes: list[str]) -> None:
+        if self.pending is not None:
+            self.lines.append(f"{self.indent * (self.depth - 1)}{self.pending}>{self.pop_text()}")
+        elif text := self.pop_text():
+            self.lines.append(f"{self.indent * self.depth}{text}")
+        self.pending = f"<{tag}" + "".join(
+            f' {name}="{escape_attribute(value)}"' for name, value in zip(attributes[::2], attributes[1::2])
+        )
+        self.depth += 1
+
+    def end(self, tag: str) -> None:
+        self.depth -= 1
+        text: str = self.pop_text()
+        if self.pending is not None:
+            self.lines.append(f"{self.indent * self.depth}{self.pending}{f'>{text}</{tag}>' if text else '/>'}")
+            self.pending = None
+        else:
+            if text:
+                self.lines.append(f"{self.indent * (self.depth + 1)}{text}")
+            self.lines.append(f"{self.indent * self.depth}</{tag}>")
+        if len(self.lines) >= self.lines_per_write:
+            self.write()
+
+    def data(self, text: str) -> None:
+        self.text += text
+
+
 def tidy_xml(path: str, suffix: str = "_tidy", remove_source: bool = True) -> str:
+    tidy_path: str = path_add_suffix(path, suffix)
     try:
-        doc = minidom.parse(path)
-        tidy_doc = doc.toprettyxml(encoding="UTF-8", newl="")
-        tidy_path: str = path[:-4] + "{}.xml".format(suffix)
-        with io.open(tidy_path, "wb") as outstream:
-            outstream.write(tidy_doc)
-    except OSError as _:
-        logger.error("fatal: Tidy XML failed. Is tidy installed? (sudo apt-get install tidy)")
+        with open_compressed(path, "rb") as instream, open_compressed(tidy_path, "w", encoding="utf-8") as outstream:
+            XmlIndenter(outstream).parse(instream)
+    except (OSError, expat.ExpatError) as ex:
+        logger.error(f"fatal: Tidy XML failed: {ex}")
+        if os.path.isfile(tidy_path):
+            os.remove(tidy_path)
         return path
 
     if remove_source:
@@ -321,15 +509,15 @@ def tidy_xml(path: str, suffix: str = "_tidy", remove_source: bool = True) -> st
 
 
 def compress_and_encode(path: str) -> None:
-    compressed_data: bytes = zlib.compress(path.encode("utf8"))
-    encoded: bytes = base64.b64encode(compressed_data)
-    uue_filename: str = path + ".gz.uue"
-    with io.open(uue_filename, "wb") as outstream:
-        outstream.write(encoded)
-
+    """Stores the gzip compressed content of file path in path.gz, and its base64 encoding in path.gz.uue."""
     gz_filename: str = path + ".gz"
-    with io.open(gz_filename, "wb") as outstream:
-        outstream.write(compressed_data)
+    with io.open(path, "rb") as instream, open_compressed(gz_filename, "wb") as outstream:
+        shutil.copyfileobj(instream, outstream, 1 << 20)
+
+    uue_filename: str = gz_filename + ".uue"
+    with io.open(gz_filename, "rb") as instream, io.open(uue_filename, "wb") as outstream:
+        while chunk := instream.read(3 << 20):
+            outstream.write(base64.b64encode(chunk))
 
 
 class Registry:
@@ -377,7 +565,9 @@ def replace_extension(filename: str, extension: str) -> str:
 
 
 def path_add_suffix(path: str, suffix: str, new_extension: str = None) -> str:
-    name, extension = splitext(path)
+    """Adds suffix to the filename in path. A compression extension is kept together with the file extension."""
+    name, extension = splitext(strip_compression_extension(path))
+    extension += path[len(name) + len(extension) :]
     return f'{name}{suffix}{extension if new_extension is None else new_extension}'
 
 
@@ -0,0 +1,55 @@
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+from loguru import logger
+
+from importer.metadata import Metadata, SeadSchema, Table
+from importer.policies import IfForeignKeyValueIsMissingAddIdentityMappingToForeignKeyTable
+from importer.submission import Submission, TableProfile
+
+# pylint: disable=redefined-outer-name
+
+
+@pytest.mark.long_running
+@pytest.mark.parametrize("n_keys", [10**3, 10**5])
+def test_benchmark_if_foreign_key_value_is_missing_add_identity_mapping(n_keys: int):
+    """Lookup table that holds every other referenced key, i.e. half of the referenced keys are missing"""
+    metadata = MagicMock(spec=Metadata)
+    submission = MagicMock(spec=Submission)
+    sead_schema = MagicMock(spec=SeadSchema)
+    table = MagicMock(spec=Table)
+    table.pk_name = "lookup_id"
+    table.table_name = "tbl_lookups"
+    sead_schema.lookup_tables = [table]
+    sead_schema.__getitem__.side_effect = lambda x: table
+    metadata.sead_schema = sead_schema
+
+    existing_keys: np.ndarray = np.arange(0, n_keys, 2)
+    submission.data_tables = {
+        table.table_name: pd.DataFrame(
+            {
+                "system_id": existing_keys,
+                table.pk_name: existing_keys,
+                "lookup_name": [f"lookup {i}" for i in existing_keys],
+            }
+        )
+    }
+    submission.get_referenced_keyset.return_value = set(range(n_keys))
+    submission.__contains__.side_effect = lambda x: x in submission.data_tables
+    submission.get_profile.side_effect = lambda x: TableProfile(submission.data_tables[x])
+
+    policy = IfForeignKeyValueIsMissingAddIdentityMappingToForeignKeyTable(metadata=metadata, submission=submission)
+
+    started: float = time.perf_counter()
+    policy.update()
+    elapsed: float = time.perf_counter() - started
+
+    logger.info(f"{n_keys} referenced keys: {elapsed:.3f}s")
+
+    data: pd.DataFrame = submission.data_tables[table.table_name]
+    assert len(data) == n_keys
+    assert set(data["system_id"]) == set(range(n_keys))
+    assert elapsed < 5.0
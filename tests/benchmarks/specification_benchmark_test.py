@@ -0,0 +1,147 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from loguru import logger
+
+from importer.metadata import Metadata
+from importer.specification import (
+    ForeignKeyExistsAsPrimaryKeySpecification,
+    SpecificationMessages,
+    SpecificationRegistry,
+    SubmissionSpecification,
+)
+from importer.submission import Submission
+from tests.specification_test import create_fk_metadata
+
+
+@pytest.mark.long_running
+@pytest.mark.parametrize("n_rows", [10**4, 2 * 10**6])
+def test_benchmark_foreign_key_exists_as_primary_key(n_rows: int):
+    """Child table where one in a thousand FK values is dangling"""
+    metadata: Metadata = create_fk_metadata()
+    parent_ids: np.ndarray = np.arange(1, n_rows // 10 + 1)
+    fk_values: np.ndarray = np.random.default_rng(0).choice(parent_ids, size=n_rows)
+    fk_values[::1000] = -1
+    submission: Submission = Submission(
+        {
+            "tbl_parents": pd.DataFrame({"system_id": parent_ids}),
+            "tbl_children": pd.DataFrame({"system_id": np.arange(n_rows), "parent_id": fk_values}),
+        },
+        metadata,
+    )
+    specification = ForeignKeyExistsAsPrimaryKeySpecification(metadata, SpecificationMessages(), ignore_columns=["(*"])
+
+    started: float = time.perf_counter()
+    specification.is_satisfied_by(submission, "tbl_children")
+    elapsed: float = time.perf_counter() - started
+
+    logger.info(f"{n_rows} FK values: {elapsed:.3f}s")
+
+    assert len(specification.warnings) == 1
+    assert f"has {len(fk_values[::1000])} value(s)" in specification.warnings[0]
+    assert elapsed < 1.0
+
+
+def create_synthetic_metadata() -> Metadata:
+    """Metadata for a site => sample (=> sample type lookup) schema, without a database"""
+
+    def column(table_name: str, column_name: str, data_type: str, position: int, **kwargs) -> dict:
+        return {
+            "table_name": table_name,
+            "column_name": column_name,
+            "xml_column_name": column_name,
+            "position": position,
+            "data_type": data_type,
+            "numeric_precision": None,
+            "numeric_scale": None,
+            "character_maximum_length": None,
+            "is_nullable": False,
+            "is_pk": False,
+            "is_fk": False,
+            "fk_table_name": None,
+            "fk_column_name": None,
+            "class_name": "".join(x.title() for x in (kwargs.get("fk_table_name") or table_name).split("_")),
+        } | kwargs
+
+    metadata: Metadata = Metadata(db_uri=None, ignore_columns=["date_updated"])
+    metadata.sead_tables = pd.DataFrame(
+        {
+            "table_name": ["tbl_sites", "tbl_sample_types", "tbl_samples"],
+            "pk_name": ["site_id", "sample_type_id", "sample_id"],
+            "java_class": ["TblSites", "TblSampleTypes", "TblSamples"],
+            "excel_sheet": ["tbl_sites", "tbl_sample_types", "tbl_samples"],
+            "is_lookup": [False, True, False],
+        }
+    ).set_index("table_name", drop=False)
+    metadata.sead_columns = pd.DataFrame(
+        [
+            column("tbl_sites", "site_id", "integer", 1, is_pk=True),
+            column("tbl_sites", "site_name", "character varying", 2),
+            column("tbl_sites", "latitude", "numeric", 3, is_nullable=True),
+            column("tbl_sample_types", "sample_type_id", "integer", 1, is_pk=True),
+            column("tbl_sample_types", "type_name", "character varying", 2),
+            column("tbl_samples", "sample_id", "integer", 1, is_pk=True),
+            column("tbl_samples", "site_id", "integer", 2, is_fk=True, fk_table_name="tbl_sites"),
+            column("tbl_samples", "sample_type_id", "integer", 3, is_fk=True, fk_table_name="tbl_sample_types"),
+            column("tbl_samples", "sample_name", "character varying", 4),
+            column("tbl_samples", "depth", "numeric", 5, is_nullable=True),
+        ]
+    )
+    metadata.find_primary_keys = lambda keys: {k: set(v) for k, v in keys.items()}
+    return metadata
+
+
+def create_synthetic_submission(metadata: Metadata, n_rows: int) -> Submission:
+    """New sites and samples (ten samples per site) referencing existing sample types"""
+    rng: np.random.Generator = np.random.default_rng(0)
+    n_sites: int = max(n_rows // 10, 1)
+    site_ids: np.ndarray = np.arange(1, n_sites + 1)
+    return Submission(
+        {
+            "tbl_sites": pd.DataFrame(
+                {
+                    "system_id": site_ids,
+                    "site_id": pd.array([None] * n_sites, dtype="Int32"),
+                    "site_name": [f"site {i}" for i in site_ids],
+                    "latitude": rng.uniform(55, 69, size=n_sites),
+                }
+            ),
+            "tbl_sample_types": pd.DataFrame(
+                {"system_id": [1, 2], "sample_type_id": [1, 2], "type_name": ["core", "surface"]}
+            ),
+            "tbl_samples": pd.DataFrame(
+                {
+                    "system_id": np.arange(1, n_rows + 1),
+                    "sample_id": pd.array([None] * n_rows, dtype="Int32"),
+                    "site_id": rng.choice(site_ids, size=n_rows),
+                    "sample_type_id": rng.choice([1, 2], size=n_rows),
+                    "sample_name": [f"sample {i}" for i in range(n_rows)],
+                    "depth": rng.uniform(0, 10, size=n_rows),
+                }
+            ),
+        },
+        metadata,
+    )
+
+
+@pytest.mark.long_running
+@pytest.mark.parametrize("n_rows", [10**3, 10**5, 10**6])
+def test_benchmark_submission_specification(n_rows: int):
+    """Full rule set on a synthetic submission, reports the cost of each rule"""
+    metadata: Metadata = create_synthetic_metadata()
+    submission: Submission = create_synthetic_submission(metadata, n_rows)
+    specification = SubmissionSpecification(
+        metadata, ignore_columns=["date_updated"], raise_errors=False, max_workers=1
+    )
+
+    started: float = time.perf_counter()
+    specification.is_satisfied_by(submission)
+    elapsed: float = time.perf_counter() - started
+
+    logger.info(f"{n_rows} rows: {elapsed:.3f}s, slowest rule: {specification.timing_summary()[0]['rule']}")
+
+    assert not specification.errors, specification.errors
+    assert {x.rule for x in specification.timings} == {cls.__name__ for cls in SpecificationRegistry.items.values()}
+    assert elapsed < 10.0
@@ -0,0 +1,116 @@
+import io
+import os
+import time
+import tracemalloc
+
+import pytest
+from loguru import logger
+
+from importer.dispatchers.serializers import Serializers, XmlSerializer
+from importer.dispatchers.to_xml import XmlProcessor
+from importer.metadata import Metadata
+from importer.submission import Submission
+from importer.utility import tidy_xml
+from tests.benchmarks.specification_benchmark_test import create_synthetic_metadata, create_synthetic_submission
+
+
+def emit_lines(filename: str, n_lines: int, buffer_size: int) -> float:
+    started: float = time.perf_counter()
+    with io.open(filename, "w", encoding="utf8") as outstream:
+        processor = XmlProcessor(outstream, buffer_size=buffer_size)
+        for i in range(n_lines):
+            processor.emit(f'<clonedId class="java.util.Integer">{i}</clonedId>', 3)
+        processor.flush()
+    return time.perf_counter() - started
+
+
+@pytest.mark.long_running
+def test_benchmark_emit_with_block_buffer(tmp_path):
+    """Line by line emit, unbuffered (each line is written to the file object) versus the default block buffer"""
+    n_lines: int = 10**6
+
+    unbuffered: float = emit_lines(str(tmp_path / "unbuffered.xml"), n_lines, buffer_size=0)
+    buffered: float = emit_lines(str(tmp_path / "buffered.xml"), n_lines, buffer_size=None)
+
+    logger.info(f"{n_lines} lines: unbuffered {unbuffered:.3f}s, buffered {buffered:.3f}s")
+
+    assert (tmp_path / "unbuffered.xml").read_bytes() == (tmp_path / "buffered.xml").read_bytes()
+    assert buffered < 2.0
+
+
+@pytest.mark.long_running
+@pytest.mark.parametrize("n_rows", [10**3, 10**5, 10**6])
+def test_benchmark_dispatch(tmp_path, n_rows: int):
+    """Dispatch of a synthetic submission with new sites and samples"""
+    metadata: Metadata = create_synthetic_metadata()
+    submission: Submission = create_synthetic_submission(metadata, n_rows)
+    filename: str = str(tmp_path / "submission.xml")
+
+    started: float = time.perf_counter()
+    with io.open(filename, "w", encoding="utf8") as outstream:
+        XmlProcessor(outstream).dispatch(metadata, submission)
+    elapsed: float = time.perf_counter() - started
+
+    logger.info(f"{n_rows} rows: {elapsed:.3f}s ({n_rows / elapsed:.0f} rows/s)")
+
+    assert elapsed < 30.0
+
+
+@pytest.mark.long_running
+def test_benchmark_tidy_xml(tmp_path):
+    """Streaming re-indentation of a dispatched synthetic submission: throughput and peak (Python) memory"""
+    metadata: Metadata = create_synthetic_metadata()
+    submission: Submission = create_synthetic_submission(metadata, 10**5)
+    filename: str = str(tmp_path / "submission.xml")
+    with io.open(filename, "w", encoding="utf8") as outstream:
+        XmlProcessor(outstream).dispatch(metadata, submission)
+    size: int = os.path.getsize(filename)
+
+    started: float = time.perf_counter()
+    tidy_xml(filename, remove_source=False)
+    elapsed: float = time.perf_counter() - started
+
+    tracemalloc.start()
+    try:
+        tidy_xml(filename, remove_source=False)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    size_mb: float = size / 2**20
+    logger.info(f"{size_mb:.1f} MB: {elapsed:.3f}s ({size_mb / elapsed:.1f} MB/s), peak memory {peak / 2**20:.1f} MB")
+
+    assert peak < size / 10
+
+
+@pytest.mark.long_running
+@pytest.mark.parametrize("serializer", ["string", "bytes", "lxml"])
+def test_benchmark_serializer(tmp_path, serializer: str):
+    """Escaping and writing of text values (every fifth with markup characters), and dispatch, per serializer"""
+    n_values: int = 10**6
+    values: list[str] = [f"sample {i} & <{i % 7}>" if i % 5 == 0 else f"sample {i}" for i in range(n_values)]
+    filename: str = str(tmp_path / f"{serializer}.xml")
+
+    started: float = time.perf_counter()
+    with io.open(filename, "w", encoding="utf8") as outstream:
+        writer: XmlSerializer = Serializers.get(serializer)(outstream)
+        for value in writer.escape_values(values):
+            writer.write(f'      <sampleName class="java.lang.String">{value}</sampleName>\n')
+        writer.flush()
+    elapsed: float = time.perf_counter() - started
+
+    metadata: Metadata = create_synthetic_metadata()
+    submission: Submission = create_synthetic_submission(metadata, 10**5)
+    started = time.perf_counter()
+    with io.open(str(tmp_path / "submission.xml"), "w", encoding="utf8") as outstream:
+        XmlProcessor(outstream, serializer=serializer).dispatch(metadata, submission)
+    dispatch_elapsed: float = time.perf_counter() - started
+
+    size_mb: float = os.path.getsize(filename) / 2**20
+    logger.info(
+        f"{serializer}: {n_values} values {elapsed:.3f}s ({size_mb / elapsed:.1f} MB/s), "
+        f"dispatch 1e5 rows {dispatch_elapsed:.3f}s"
+    )
+
+    with io.open(filename, "r", encoding="utf8") as fp:
+        assert fp.readline() == '      <sampleName class="java.lang.String">sample 0 &amp; &lt;0&gt;</sampleName>\n'
@@ -0,0 +1,98 @@
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+from importer.cache import LOADER_MODULES, SubmissionCache
+from importer.metadata import Metadata
+from importer.submission import Submission
+
+# pylint: disable=unused-argument
+
+
+def test_submission_cache_key_depends_on_workbook_policies_metadata_and_code(tmp_path):
+    source = tmp_path / "submission.xlsx"
+    source.write_bytes(b"workbook")
+    metadata = MagicMock(spec=Metadata)
+    metadata.fingerprint = "abc"
+    config_value = MagicMock()
+    config_value.resolve.return_value = {"some_policy": {"disabled": True}}
+
+    with patch("importer.cache.ConfigValue", return_value=config_value):
+        cache = SubmissionCache(str(tmp_path / "cache"), metadata)
+        key = cache.key(str(source))
+        assert key == cache.key(str(source))
+
+        metadata.fingerprint = "def"
+        assert key != cache.key(str(source))
+
+        metadata.fingerprint = "abc"
+        config_value.resolve.return_value = {"some_policy": {"disabled": False}}
+        assert key != cache.key(str(source))
+
+        config_value.resolve.return_value = {"some_policy": {"disabled": True}}
+        assert key == cache.key(str(source))
+        with patch("importer.cache.loader_version", return_value="another version"):
+            assert key != cache.key(str(source))
+
+        source.write_bytes(b"another workbook")
+        assert key != cache.key(str(source))
+
+
+def test_submission_cache_store_and_load(tmp_path):
+    cache = SubmissionCache(str(tmp_path), MagicMock(spec=Metadata))
+    data_tables = {
+        "tbl_b": pd.DataFrame({"system_id": pd.array([1, 2], dtype="Int32"), "name": ["x", None]}),
+        "tbl_a": pd.DataFrame({"system_id": [1]}),
+    }
+
+    assert cache.load("key") is None
+    cache.store("key", data_tables)
+    cached = cache.load("key")
+
+    assert list(cached) == ["tbl_b", "tbl_a"]
+    for table_name, data in data_tables.items():
+        pd.testing.assert_frame_equal(cached[table_name], data)
+
+
+def test_submission_load_uses_cache_on_hit(cfg, tmp_path):
+    source = tmp_path / "submission.xlsx"
+    source.write_bytes(b"workbook")
+    metadata = MagicMock(spec=Metadata)
+    data_tables = {"tbl_a": pd.DataFrame({"system_id": [1]})}
+
+    with (
+        patch.object(SubmissionCache, "key", return_value="key"),
+        patch.object(Submission, "load_data_tables", return_value=data_tables) as load_data_tables,
+        patch("importer.submission.PolicyRunner") as runner,
+    ):
+        Submission.load(metadata=metadata, source=str(source), cache_folder=str(tmp_path / "cache"))
+        submission = Submission.load(metadata=metadata, source=str(source), cache_folder=str(tmp_path / "cache"))
+
+    assert load_data_tables.call_count == 1
+    assert runner.call_count == 1
+    pd.testing.assert_frame_equal(submission.data_tables["tbl_a"], data_tables["tbl_a"])
+
+
+def test_submission_load_skips_cache_when_policy_report_is_requested(tmp_path):
+    source = tmp_path / "submission.xlsx"
+    source.write_bytes(b"workbook")
+    metadata = MagicMock(spec=Metadata)
+    data_tables = {"tbl_a": pd.DataFrame({"system_id": [1]})}
+    config_value = MagicMock()
+    config_value.resolve.return_value = True
+
+    with (
+        patch.object(SubmissionCache, "key", return_value="key"),
+        patch.object(Submission, "load_data_tables", return_value=data_tables) as load_data_tables,
+        patch("importer.submission.PolicyRunner") as runner,
+        patch("importer.submission.ConfigValue", return_value=config_value),
+    ):
+        Submission.load(metadata=metadata, source=str(source), cache_folder=str(tmp_path / "cache"))
+        Submission.load(metadata=metadata, source=str(source), cache_folder=str(tmp_path / "cache"))
+
+    assert load_data_tables.call_count == 2
+    assert runner.call_count == 2
+
+
+def test_loader_version_covers_loader_helpers_and_metadata():
+    assert {"importer.utility", "importer.metadata"} <= set(LOADER_MODULES)
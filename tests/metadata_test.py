@@ -1,8 +1,10 @@
+from unittest.mock import MagicMock, patch
+
 import pandas as pd
 import pytest
 
 from importer.configuration.config import Config
-from importer.metadata import Metadata
+from importer.metadata import Metadata, SeadSchema
 from importer.utility import create_db_uri
 
 # pylint: disable=redefined-outer-name,no-member
@@ -84,3 +86,24 @@ def test_foreign_keys(metadata: Metadata, values: list[str]):
     assert isinstance(metadata.foreign_keys, pd.DataFrame)
     assert len(metadata.foreign_keys) > 0
     assert (metadata.foreign_keys == values).all(axis=1).any()
+
+
+def test_find_primary_keys_uses_a_single_query_and_caches_result():
+    metadata: Metadata = Metadata("postgresql://user@localhost:5432/dbname", ignore_columns=["date_updated"])
+    metadata.__dict__['sead_schema'] = SeadSchema(
+        {
+            'tbl_a': MagicMock(pk_name='a_id'),
+            'tbl_b': MagicMock(pk_name='b_id'),
+        }
+    )
+    found: pd.DataFrame = pd.DataFrame({'table_name': ['tbl_a', 'tbl_b'], 'key': [1, 10]})
+
+    with patch('importer.metadata.load_dataframe_from_postgres', return_value=found) as mock_load:
+        keys: dict[str, set[int]] = metadata.find_primary_keys({'tbl_a': {1, 2}, 'tbl_b': [10]})
+        assert keys == {'tbl_a': {1}, 'tbl_b': {10}}
+        assert mock_load.call_count == 1
+        assert 'union all' in mock_load.call_args[0][0]
+
+        keys = metadata.find_primary_keys({'tbl_a': {2, 1}})
+        assert keys == {'tbl_a': {1}}
+        assert mock_load.call_count == 1
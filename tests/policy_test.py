@@ -1,3 +1,4 @@
+import time
 from unittest.mock import MagicMock, patch
 
 import numpy as np
@@ -12,9 +13,11 @@ from importer.policies import (
     IfLookupWithNoNewDataThenKeepOnlySystemIdPublicId,
     IfSystemIdIsMissingSetSystemIdToPublicId,
     PolicyBase,
+    PolicyRunner,
+    TablePolicyBase,
     UpdateTypesBasedOnSeadSchema,
 )
-from importer.submission import Submission
+from importer.submission import Submission, TableProfile
 
 
 def test_initialization():
@@ -76,17 +79,24 @@ def test_if_lookup_table_is_missing_add_table_using_system_id_as_public_id():
     table = MagicMock(spec=Table)
     table.pk_name = "id"
     metadata.__getitem__.return_value = table
-    submission.get_referenced_keyset.return_value = [1, 2, 3]
+    metadata.find_primary_keys.return_value = {"table1": {1, 2}}
+    submission.get_referenced_keysets.return_value = {"table1": {3, 1, 2}, "table2": {4}}
     submission.data_tables = {}
 
     config_value = MagicMock()
-    config_value.resolve.return_value = {"table1"}
+    config_value.resolve.side_effect = [
+        False,  # call to is_disabled()
+        ["table1"],  # tables to include
+        [],  # tables to exclude
+    ]
 
     with patch("importer.policies.ConfigValue", return_value=config_value):
         policy = AddIdentityMappingSystemIdToPublicIdPolicy(metadata=metadata, submission=submission)
         policy.apply()
 
+    metadata.find_primary_keys.assert_called_once_with({"table1": {1, 2, 3}})
     assert "table1" in submission.data_tables
+    assert "table2" not in submission.data_tables
     assert list(submission.data_tables["table1"]["system_id"]) == [1, 2, 3]
     assert list(submission.data_tables["table1"]["id"]) == [1, 2, 3]
 
@@ -119,6 +129,23 @@ def test_update_types_based_on_sead_schema():
     assert submission.data_tables["table1"]["col3"].dtype == "Int64"
 
 
+def test_update_types_based_on_sead_schema_skips_columns_with_target_dtype():
+    metadata = MagicMock(spec=Metadata)
+    submission = MagicMock(spec=Submission)
+    table = MagicMock(spec=Table)
+    table.columns = {"col1": MagicMock(data_type="smallint"), "col2": MagicMock(data_type="integer")}
+    metadata.__getitem__.return_value = table
+    data_table = pd.DataFrame({"col1": pd.array([1, 2, 3], dtype="Int16"), "col2": [4, 5, 6]})
+    submission.data_tables = {"table1": data_table}
+    values: np.ndarray = data_table["col1"].array._data
+
+    policy = UpdateTypesBasedOnSeadSchema(metadata=metadata, submission=submission)
+    policy.apply()
+
+    assert np.shares_memory(submission.data_tables["table1"]["col1"].array._data, values)
+    assert submission.data_tables["table1"]["col2"].dtype == "Int32"
+
+
 def test_if_system_id_is_missing_set_system_id_to_public_id():
     metadata = MagicMock(spec=Metadata)
     submission = MagicMock(spec=Submission)
@@ -153,6 +180,7 @@ def test_if_foreign_key_value_is_missing_add_identity_mapping_to_foreign_key_tab
     submission.get_referenced_keyset.return_value = [1, 2, 3]
     submission.data_tables = {table.table_name: pd.DataFrame({"system_id": [1], table.pk_name: [1]})}
     submission.__contains__.side_effect = lambda x: x in submission.data_tables
+    submission.get_profile.side_effect = lambda x: TableProfile(submission.data_tables[x])
 
     policy = IfForeignKeyValueIsMissingAddIdentityMappingToForeignKeyTable(metadata=metadata, submission=submission)
     policy.apply()
@@ -204,6 +232,8 @@ def test_if_lookup_with_no_new_data_then_keep_only_system_id_public_id__all_pk_v
         )
     }
 
+    submission.get_profile.side_effect = lambda x: TableProfile(submission.data_tables[x])
+
     policy: PolicyBase = IfLookupWithNoNewDataThenKeepOnlySystemIdPublicId(metadata=metadata, submission=submission)
     policy.update()
 
@@ -223,9 +253,166 @@ def test_not_all_pk_values_null():
             {"system_id": [1, 2, 3], "public_id": [None, 2, None], "col1": [4, 5, 6], "col2": [7, 8, 9]}
         )
     }
+    submission.get_profile.side_effect = lambda x: TableProfile(submission.data_tables[x])
 
     policy: PolicyBase = IfLookupWithNoNewDataThenKeepOnlySystemIdPublicId(metadata=metadata, submission=submission)
     policy.update()
 
     assert "col1" in submission.data_tables["table1"].columns
     assert "col2" in submission.data_tables["table1"].columns
+
+
+def test_if_foreign_key_value_is_missing_add_identity_mapping_keeps_dtypes():
+    metadata = MagicMock(spec=Metadata)
+    submission = MagicMock(spec=Submission)
+    sead_schema = MagicMock(spec=SeadSchema)
+    table = MagicMock(spec=Table)
+    table.pk_name = "public_id"
+    table.table_name = "tbl_table"
+    sead_schema.lookup_tables = [table]
+    metadata.sead_schema = sead_schema
+    sead_schema.__getitem__.side_effect = lambda x: table
+    submission.get_referenced_keyset.return_value = {3, 1, 4}
+    submission.data_tables = {
+        table.table_name: pd.DataFrame(
+            {"system_id": [1, 2], table.pk_name: [1, 2], "count": [10, 20], "name": ["a", "b"]}, index=[5, 7]
+        )
+    }
+    submission.__contains__.side_effect = lambda x: x in submission.data_tables
+    submission.get_profile.side_effect = lambda x: TableProfile(submission.data_tables[x])
+
+    policy = IfForeignKeyValueIsMissingAddIdentityMappingToForeignKeyTable(metadata=metadata, submission=submission)
+    policy.apply()
+
+    data: pd.DataFrame = submission.data_tables[table.table_name]
+    assert list(data["system_id"]) == [1, 2, 3, 4]
+    assert list(data[table.pk_name]) == [1, 2, 3, 4]
+    assert list(data.index) == [0, 1, 2, 3]
+    assert data["system_id"].dtype == "int64"
+    assert data["count"].dtype == "Int64"
+    assert data["count"].isna().tolist() == [False, False, True, True]
+    assert data["name"].tolist()[:2] == ["a", "b"]
+
+
+class RecordingTablePolicy(TablePolicyBase):
+    visits: list[tuple[str, str]] = []
+
+    def visit(self, table_name: str, data_table: pd.DataFrame, table: Table) -> None:
+        self.visits.append((self.get_id(), table_name))
+
+
+class FirstTablePolicy(RecordingTablePolicy): ...
+
+
+class SecondTablePolicy(RecordingTablePolicy): ...
+
+
+class ThirdTablePolicy(RecordingTablePolicy): ...
+
+
+class RecordingCrossTablePolicy(PolicyBase):
+    def update(self) -> None:
+        RecordingTablePolicy.visits.append((self.get_id(), "*"))
+
+
+def test_policy_runner_fuses_table_policies_into_single_pass():
+    metadata = MagicMock(spec=Metadata)
+    submission = MagicMock(spec=Submission)
+    metadata.__getitem__.return_value = MagicMock(spec=Table)
+    submission.data_tables = {"table1": pd.DataFrame(), "table2": pd.DataFrame()}
+    submission.policy_statistics = []
+    RecordingTablePolicy.visits = []
+
+    config_value = MagicMock()
+    config_value.resolve.return_value = None
+
+    with patch("importer.policies.ConfigValue", return_value=config_value):
+        runner = PolicyRunner(
+            metadata,
+            submission,
+            policies=[FirstTablePolicy, SecondTablePolicy, RecordingCrossTablePolicy, ThirdTablePolicy],
+            max_workers=1,
+            measure=True,
+        )
+        assert [len(group) for group in runner.groups()] == [2, 1, 1]
+        runner.run()
+
+    assert RecordingTablePolicy.visits == [
+        ("first_table_policy", "table1"),
+        ("second_table_policy", "table1"),
+        ("first_table_policy", "table2"),
+        ("second_table_policy", "table2"),
+        ("recording_cross_table_policy", "*"),
+        ("third_table_policy", "table1"),
+        ("third_table_policy", "table2"),
+    ]
+    assert metadata.__getitem__.call_count == 4
+    assert len(submission.policy_statistics) == 7
+
+
+class LoggingTablePolicy(TablePolicyBase):
+    def visit(self, table_name: str, data_table: pd.DataFrame, table: Table) -> None:
+        time.sleep(0.01 * (5 - int(table_name[-1])))
+        data_table["visited"] = True
+        self.log(table_name, f"visited {table_name}")
+
+
+def test_policy_runner_visits_tables_in_parallel_with_deterministic_logs():
+    metadata = MagicMock(spec=Metadata)
+    submission = MagicMock(spec=Submission)
+    metadata.__getitem__.return_value = MagicMock(spec=Table)
+    submission.data_tables = {f"table{i}": pd.DataFrame({"a": [i]}) for i in range(1, 5)}
+    submission.policy_statistics = []
+
+    config_value = MagicMock()
+    config_value.resolve.return_value = None
+
+    with patch("importer.policies.ConfigValue", return_value=config_value):
+        runner = PolicyRunner(
+            metadata, submission, policies=[LoggingTablePolicy, RecordingCrossTablePolicy], max_workers=4, measure=True
+        )
+        runner.run()
+
+    policy = runner.policies[0]
+    assert all(data["visited"].all() for data in submission.data_tables.values())
+    assert list(policy.logs) == ["table1", "table2", "table3", "table4"]
+    assert [x.table_name for x in policy.statistics] == ["table1", "table2", "table3", "table4"]
+
+
+def test_policy_statistics_records_changes_made_by_policy():
+    metadata = MagicMock(spec=Metadata)
+    submission = MagicMock(spec=Submission)
+    table = MagicMock(spec=Table)
+    table.pk_name = "id"
+    metadata.__getitem__.return_value = table
+    submission.data_tables = {"table1": pd.DataFrame({"col1": [1, 2]}), "table2": pd.DataFrame({"id": [1]})}
+
+    policy = AddPrimaryKeyColumnIfMissingPolicy(metadata=metadata, submission=submission)
+    policy.measure = True
+    policy.apply()
+
+    statistics = {x.table_name: x for x in policy.statistics}
+    assert set(statistics) == {"table1", "table2"}
+    assert statistics["table1"].columns_added == ["id"]
+    assert statistics["table1"].memory_delta > 0
+    assert statistics["table1"].elapsed is not None
+    assert not statistics["table2"].has_changes
+
+
+def test_policy_runner_does_not_measure_changes_unless_requested():
+    metadata = MagicMock(spec=Metadata)
+    submission = MagicMock(spec=Submission)
+    metadata.__getitem__.return_value = MagicMock(spec=Table)
+    submission.data_tables = {"table1": pd.DataFrame({"a": [1]})}
+    submission.policy_statistics = []
+
+    config_value = MagicMock()
+    config_value.resolve.return_value = None
+
+    with patch("importer.policies.ConfigValue", return_value=config_value):
+        runner = PolicyRunner(metadata, submission, policies=[LoggingTablePolicy, RecordingCrossTablePolicy])
+        runner.run()
+
+    assert not runner.measure
+    assert submission.data_tables["table1"]["visited"].all()
+    assert submission.policy_statistics == []
@@ -1,10 +1,12 @@
 import filecmp
 import os
 import pickle
+from unittest.mock import MagicMock
 
 import pandas as pd
 
 from importer.configuration.config import Config
+from importer.dispatchers import IDispatcher
 from importer.metadata import Metadata
 from importer.process import ImportService, Options
 from importer.submission import Submission
@@ -74,3 +76,33 @@ def load_or_cache_submission(opts, metadata) -> Submission:
         with open(pickled_filename, "rb") as fp:
             submission: dict[str, pd.DataFrame] = pickle.load(fp)
     return submission
+
+
+class TextDispatcher(IDispatcher):
+    def __init__(self, outstream) -> None:
+        self.outstream = outstream
+
+    def dispatch(self, metadata, submission, table_names=None, extra_names=None):
+        self.outstream.write("<dispatched/>")
+
+
+def test_dispatch_creates_dispatcher_without_xml_options(cfg: Config, tmp_path):
+    opts: Options = Options(
+        filename='data/input/dummy.xlsx',
+        skip=False,
+        submission_id=None,
+        submission_name='dummy',
+        data_types='dendrochronology',
+        output_folder=str(tmp_path),
+        timestamp=False,
+        xml_buffer_size=1024,
+        xml_serializer='bytes',
+    )
+    service: ImportService = ImportService(
+        opts=opts, metadata=MagicMock(spec=Metadata), repository=MagicMock(), dispatcher_cls=TextDispatcher
+    )
+
+    target_filename: str = service.dispatch(MagicMock(spec=Submission))
+
+    with open(target_filename, encoding="utf-8") as fp:
+        assert fp.read() == "<dispatched/>"
@@ -0,0 +1,367 @@
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from importer.metadata import Column, Metadata, Table
+from importer.specification import (
+    ForeignKeyExistsAsPrimaryKeySpecification,
+    NonNullableColumnHasValueSpecification,
+    PublicIdExistsInSeadSpecification,
+    SpecificationBase,
+    SpecificationMessages,
+    SpecificationRegistry,
+    SpecificationStage,
+    SubmissionSpecification,
+    SubmissionTableTypesSpecification,
+)
+from importer.submission import Submission
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        [1, 2, 3],
+        [1.5, np.nan, 3.0],
+        ["a", "b"],
+        [1, "a", 2.5, None],
+        [True, 1],
+        [1 + 0j, 2j, "x"],
+        [pd.Timestamp("2020-01-01"), "x"],
+    ],
+)
+def test_non_numeric_mask_agrees_with_isreal(values):
+    series = pd.Series(values, dtype=object if any(isinstance(x, str) for x in values) else None)
+    series = series[~series.isna()]
+    expected = ~series.apply(np.isreal).to_numpy(dtype=bool)
+    assert (SubmissionTableTypesSpecification.non_numeric_mask(series) == expected).all()
+
+
+def test_submission_table_types_specification_reports_values_and_positions():
+    metadata = MagicMock(spec=Metadata)
+    table = MagicMock(spec=Table)
+    column = MagicMock(spec=Column)
+    column.column_name = "value"
+    column.data_type = "numeric"
+    table.columns = {"value": column}
+    metadata.__getitem__.return_value = table
+    submission = MagicMock(spec=Submission)
+    submission.data_tables = {"table1": pd.DataFrame({"value": [1.0, None, "abc", 2, "abc"]})}
+
+    specification = SubmissionTableTypesSpecification(metadata, SpecificationMessages(), ignore_columns=["(*"])
+    specification.is_satisfied_by(submission, "table1")
+
+    assert specification.errors == ["Column 'table1.value' has non-numeric values: 'abc'"]
+    assert specification.infos == ["Column 'table1.value' has 2 non-numeric value(s) at row position(s): 2, 4"]
+
+
+class EvenRowsSpecification(SpecificationBase):
+    def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
+        time.sleep(0.001 * len(table_name))
+        if len(submission.data_tables[table_name]) % 2:
+            self.error(f"Table {table_name} has an odd number of rows")
+        self.info(f"Table {table_name} checked")
+
+
+class HasValueColumnSpecification(SpecificationBase):
+    def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
+        if "value" not in submission.data_tables[table_name].columns:
+            self.warn(f"Table {table_name} has no value column")
+
+
+def test_submission_specification_runs_jobs_in_parallel_with_same_messages():
+    metadata = MagicMock(spec=Metadata)
+    submission = MagicMock(spec=Submission)
+    submission.data_tables = {
+        f"table{i}": pd.DataFrame({"value" if i % 3 else "other": range(i)}) for i in range(1, 10)
+    }
+    registry = {"even": EvenRowsSpecification, "value": HasValueColumnSpecification}
+
+    with patch.object(SpecificationRegistry, "items", registry):
+        results = []
+        for max_workers in [1, 4]:
+            specification = SubmissionSpecification(
+                metadata, ignore_columns=["(*"], raise_errors=False, max_workers=max_workers
+            )
+            assert not specification.is_satisfied_by(submission)
+            results.append(specification.messages)
+
+    assert results[0] == results[1]
+    assert len(results[1].errors) == 5 and len(results[1].warnings) == 3 and len(results[1].infos) == 9
+
+
+class InstanceRecordingSpecification(SpecificationBase):
+    instances: set[int] = set()
+
+    def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
+        InstanceRecordingSpecification.instances.add(id(self))
+        self.info(f"Table {table_name} checked")
+
+
+def test_submission_specification_reuses_specification_instance_between_tables():
+    metadata = MagicMock(spec=Metadata)
+    submission = MagicMock(spec=Submission)
+    submission.data_tables = {f"table{i}": pd.DataFrame() for i in range(1, 5)}
+
+    with patch.object(SpecificationRegistry, "items", {"recording": InstanceRecordingSpecification}):
+        InstanceRecordingSpecification.instances = set()
+        specification = SubmissionSpecification(metadata, ignore_columns=["(*"], raise_errors=False)
+        assert specification.max_workers == 1
+        assert specification.is_satisfied_by(submission)
+
+    assert len(InstanceRecordingSpecification.instances) == 1
+    assert len(specification.infos) == 4
+
+
+def create_fk_metadata(fk_table_is_lookup: bool = False) -> MagicMock:
+    metadata = MagicMock(spec=Metadata)
+    column = MagicMock(spec=Column)
+    column.column_name = "parent_id"
+    column.is_fk = True
+    column.is_nullable = True
+    column.fk_table_name = "tbl_parents"
+    child = MagicMock(spec=Table)
+    child.columns = {"parent_id": column}
+    child.is_lookup = False
+    parent = MagicMock(spec=Table)
+    parent.is_lookup = fk_table_is_lookup
+    parent.columns = {}
+    metadata.__getitem__.side_effect = lambda x: child if x == "tbl_children" else parent
+    return metadata
+
+
+def test_foreign_key_exists_as_primary_key_specification_reports_dangling_keys():
+    metadata = create_fk_metadata()
+    submission = Submission(
+        {
+            "tbl_parents": pd.DataFrame({"system_id": [1, 2, 3]}),
+            "tbl_children": pd.DataFrame({"system_id": [1, 2, 3, 4], "parent_id": [1, 5, None, 5]}),
+        },
+        metadata,
+    )
+
+    specification = ForeignKeyExistsAsPrimaryKeySpecification(metadata, SpecificationMessages(), ignore_columns=["(*"])
+    specification.is_satisfied_by(submission, "tbl_children")
+
+    assert specification.warnings == [
+        "Foreign key 'tbl_children.parent_id' has 2 value(s) (1 distinct) not found as system_id in 'tbl_parents': 5"
+    ]
+    assert not specification.errors
+
+
+def test_non_nullable_column_has_value_specification_reports_new_rows_only():
+    metadata = MagicMock(spec=Metadata)
+    column = MagicMock(spec=Column)
+    column.is_pk = column.is_fk = False
+    table = MagicMock(spec=Table)
+    table.pk_name = "sample_id"
+    table.columns = {"name": column}
+    table.column_names.return_value = ["name"]
+    metadata.__getitem__.return_value = table
+    metadata.__contains__.return_value = True
+    submission = Submission(
+        {"tbl_samples": pd.DataFrame({"sample_id": [1, None, None, 2], "name": [None, "a", None, None]})}, metadata
+    )
+
+    specification = NonNullableColumnHasValueSpecification(metadata, SpecificationMessages(), ignore_columns=["(*"])
+    specification.is_satisfied_by(submission, "tbl_samples")
+
+    assert specification.errors == ["Table tbl_samples has NULL values in non-nullable column name"]
+    assert specification.messages.findings[0].rows == [2]
+
+
+def test_get_system_id_index_is_recreated_when_table_is_replaced():
+    submission = Submission({"tbl_parents": pd.DataFrame({"system_id": [1, 2, 2]})}, MagicMock(spec=Metadata))
+
+    index = submission.get_system_id_index("tbl_parents")
+    assert submission.get_system_id_index("tbl_parents") is index
+    assert sorted(index) == [1.0, 2.0]
+
+    submission.data_tables["tbl_parents"] = pd.DataFrame({"system_id": [3]})
+    assert list(submission.get_system_id_index("tbl_parents")) == [3.0]
+
+
+class ExpensiveSpecification(SpecificationBase):
+    stage: SpecificationStage = SpecificationStage.INTEGRITY
+    calls: list[str] = []
+
+    def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
+        self.calls.append(table_name)
+
+
+class MissingSheetSpecification(SpecificationBase):
+    stage: SpecificationStage = SpecificationStage.STRUCTURAL
+
+    def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
+        self.error(f"Table {table_name} is missing")
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_submission_specification_stops_when_error_budget_is_used_up(max_workers: int):
+    metadata = MagicMock(spec=Metadata)
+    submission = MagicMock(spec=Submission)
+    submission.data_tables = {f"table{i}": pd.DataFrame() for i in range(1, 5)}
+    registry = {"expensive": ExpensiveSpecification, "missing": MissingSheetSpecification}
+
+    with patch.object(SpecificationRegistry, "items", registry):
+        ExpensiveSpecification.calls = []
+        specification = SubmissionSpecification(
+            metadata, ignore_columns=["(*"], raise_errors=False, max_workers=max_workers, max_errors=2
+        )
+        assert not specification.is_satisfied_by(submission)
+        assert specification.errors == ["Table table1 is missing", "Table table2 is missing"]
+        assert specification.infos == ["Submission check stopped early: error budget of 2 error(s) used up"]
+
+        specification = SubmissionSpecification(
+            metadata, ignore_columns=["(*"], raise_errors=False, max_workers=max_workers, fail_fast=True
+        )
+        assert not specification.is_satisfied_by(submission)
+        assert specification.errors == ["Table table1 is missing"]
+
+        assert not ExpensiveSpecification.calls
+
+
+class CountingSpecification(SpecificationBase):
+    calls: list[str] = []
+
+    def is_satisfied_by(self, submission: Submission, table_name: str) -> None:
+        self.calls.append(table_name)
+        self.warn(f"Table {table_name} has {len(submission.data_tables[table_name])} rows")
+
+
+def test_submission_specification_reuses_cached_messages_for_unchanged_tables(tmp_path):
+    metadata = MagicMock(spec=Metadata)
+    metadata.fingerprint = "abc"
+    submission = MagicMock(spec=Submission)
+    submission.data_tables = {"table1": pd.DataFrame({"a": [1, 2]}), "table2": pd.DataFrame({"a": ["x"]})}
+
+    def check() -> list[str]:
+        specification = SubmissionSpecification(
+            metadata, ignore_columns=["(*"], raise_errors=False, max_workers=1, cache_folder=str(tmp_path)
+        )
+        specification.is_satisfied_by(submission)
+        return specification.warnings
+
+    with patch.object(SpecificationRegistry, "items", {"counting": CountingSpecification}):
+        CountingSpecification.calls = []
+        assert check() == ["Table table1 has 2 rows", "Table table2 has 1 rows"]
+        assert check() == ["Table table1 has 2 rows", "Table table2 has 1 rows"]
+        assert CountingSpecification.calls == ["table1", "table2"]
+
+        submission.data_tables["table2"] = pd.DataFrame({"a": ["x", "y"]})
+        assert check() == ["Table table1 has 2 rows", "Table table2 has 2 rows"]
+        assert CountingSpecification.calls == ["table1", "table2", "table2"]
+
+        metadata.fingerprint = "def"
+        check()
+        assert CountingSpecification.calls == ["table1", "table2", "table2", "table1", "table2"]
+
+
+def test_submission_specification_writes_findings_with_row_positions(tmp_path):
+    metadata = create_fk_metadata()
+    metadata.fingerprint = "abc"
+    submission = Submission(
+        {
+            "tbl_parents": pd.DataFrame({"system_id": [1, 2, 3]}),
+            "tbl_children": pd.DataFrame({"system_id": [1, 2, 3, 4], "parent_id": [1, 5, None, 5]}),
+        },
+        metadata,
+    )
+    report_filename = tmp_path / "findings.ndjson"
+    registry = {"fk": ForeignKeyExistsAsPrimaryKeySpecification}
+
+    with patch.object(SpecificationRegistry, "items", registry):
+        specification = SubmissionSpecification(
+            metadata, ignore_columns=["(*"], raise_errors=False, max_workers=1, report_filename=str(report_filename)
+        )
+        specification.is_satisfied_by(submission)
+
+    findings = [json.loads(line) for line in report_filename.read_text().splitlines()]
+
+    assert findings == [
+        {
+            "severity": "warning",
+            "rule": "ForeignKeyExistsAsPrimaryKeySpecification",
+            "table": "tbl_children",
+            "column": "parent_id",
+            "message": specification.warnings[0],
+            "row_count": 2,
+            "rows": [1, 3],
+        }
+    ]
+    assert not specification.messages.findings
+
+
+def test_public_id_exists_in_sead_specification_reports_missing_public_ids():
+    metadata = create_fk_metadata()
+    metadata.__contains__.return_value = True
+    metadata.__getitem__("tbl_children").pk_name = "child_id"
+    metadata.find_primary_keys.side_effect = lambda keys: {
+        table_name: {x for x in values if x != 7} for table_name, values in keys.items()
+    }
+    submission = Submission(
+        {"tbl_children": pd.DataFrame({"system_id": [1, 2, 3], "child_id": [None, 7, 8], "parent_id": [4, 5, 7]})},
+        metadata,
+    )
+
+    specification = PublicIdExistsInSeadSpecification(metadata, SpecificationMessages(), ignore_columns=["(*"])
+    specification.is_satisfied_by(submission, "tbl_children")
+
+    metadata.find_primary_keys.assert_called_once_with({"tbl_children": {7, 8}, "tbl_parents": {4, 5, 7}})
+    assert specification.errors == [
+        "Table tbl_children: 1 public id(s) in column child_id not found in SEAD table tbl_children: 7",
+        "Table tbl_children: 1 public id(s) in column parent_id not found in SEAD table tbl_parents: 7",
+    ]
+    assert [x.rows for x in specification.messages.findings] == [[1], [2]]
+
+
+def test_key_specifications_report_non_numeric_key_values():
+    metadata = create_fk_metadata()
+    metadata.__contains__.return_value = True
+    metadata.__getitem__("tbl_children").pk_name = "child_id"
+    metadata.find_primary_keys.side_effect = lambda keys: keys
+    data_table = pd.DataFrame({"system_id": [1, 2, 3], "child_id": [None, 7, "x"], "parent_id": [1, "a", None]})
+
+    specification = ForeignKeyExistsAsPrimaryKeySpecification(metadata, SpecificationMessages(), ignore_columns=["(*"])
+    specification.is_satisfied_by(
+        Submission({"tbl_parents": pd.DataFrame({"system_id": [1]}), "tbl_children": data_table}, metadata),
+        "tbl_children",
+    )
+    assert specification.errors == ["Table tbl_children: 1 non-numeric key value(s) in column parent_id: 'a'"]
+    assert specification.messages.findings[0].rows == [1]
+
+    specification = PublicIdExistsInSeadSpecification(metadata, SpecificationMessages(), ignore_columns=["(*"])
+    specification.is_satisfied_by(Submission({"tbl_children": data_table}, metadata), "tbl_children")
+    assert specification.errors == [
+        "Table tbl_children: 1 non-numeric key value(s) in column child_id: 'x'",
+        "Table tbl_children: 1 non-numeric key value(s) in column parent_id: 'a'",
+    ]
+    assert [x.rows for x in specification.messages.findings] == [[2], [1]]
+
+
+def test_submission_specification_records_timing_per_rule_and_table(tmp_path):
+    metadata = MagicMock(spec=Metadata)
+    metadata.fingerprint = "abc"
+    submission = MagicMock(spec=Submission)
+    submission.data_tables = {f"table{i}": pd.DataFrame({"value": range(i)}) for i in range(1, 4)}
+    registry = {"even": EvenRowsSpecification, "counting": CountingSpecification}
+
+    with patch.object(SpecificationRegistry, "items", registry):
+        for _ in range(2):
+            specification = SubmissionSpecification(
+                metadata, ignore_columns=["(*"], raise_errors=False, max_workers=2, cache_folder=str(tmp_path)
+            )
+            specification.is_satisfied_by(submission)
+
+    assert [(x.rule, x.table) for x in specification.timings] == [
+        (rule, f"table{i}") for rule in ["EvenRowsSpecification", "CountingSpecification"] for i in range(1, 4)
+    ]
+    assert all(x.cached for x in specification.timings)
+
+    summary = specification.timing_summary()
+    assert {x["rule"] for x in summary} == {"EvenRowsSpecification", "CountingSpecification"}
+    assert all(x["tables"] == 3 and x["cached"] == 3 for x in summary)
+    assert summary[0]["elapsed"] >= summary[1]["elapsed"]
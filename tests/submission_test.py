@@ -1,4 +1,8 @@
+import pickle
 from os.path import isfile
+from unittest.mock import MagicMock
+
+import pandas as pd
 
 from importer.configuration import Config
 from importer.metadata import Metadata
@@ -73,3 +77,73 @@ def test_tables_specifications(cfg: Config, submission: Submission):
     specifixation: SubmissionSpecification = SubmissionSpecification(metadata=metadata, ignore_columns=ignore_columns)
     specifixation.is_satisfied_by(submission)
     assert specifixation.messages.errors == []
+
+
+def test_get_referenced_keysets():
+    metadata = MagicMock(spec=Metadata)
+    metadata.foreign_keys = pd.DataFrame(
+        {
+            'table_name': ['tbl_samples', 'tbl_samples', 'tbl_analyses', 'tbl_other'],
+            'column_name': ['site_id', 'sample_type_id', 'site_id', 'site_id'],
+            'fk_table_name': ['tbl_sites', 'tbl_sample_types', 'tbl_sites', 'tbl_sites'],
+            'class_name': ['TblSites', 'TblSampleTypes', 'TblSites', 'TblSites'],
+        }
+    )
+    pk_names: dict[str, str] = {'tbl_sites': 'site_id', 'tbl_sample_types': 'sample_type_id'}
+    metadata.__contains__.side_effect = lambda x: x in pk_names
+    metadata.__getitem__.side_effect = lambda x: MagicMock(pk_name=pk_names[x])
+
+    submission: Submission = Submission(
+        {
+            'tbl_samples': pd.DataFrame({'site_id': [1, 2, None], 'sample_type_id': [5, 5, 6]}),
+            'tbl_analyses': pd.DataFrame({'site_id': [2.0, 3.0]}),
+        },
+        metadata,
+    )
+
+    assert submission.get_referenced_keysets(metadata) == {'tbl_sites': {1, 2, 3}, 'tbl_sample_types': {5, 6}}
+
+
+def test_get_profile_is_cached_until_table_changes():
+    submission: Submission = Submission(
+        {'tbl_samples': pd.DataFrame({'system_id': [1, 2, 2], 'value': [None, None, None], 'name': ['a', None, 'b']})},
+        MagicMock(spec=Metadata),
+    )
+
+    profile = submission.get_profile('tbl_samples')
+    assert submission.get_profile('tbl_samples') is profile
+    assert profile.null_counts == {'system_id': 0, 'value': 3, 'name': 1}
+    assert profile.all_null('value') and profile.any_null('name') and not profile.any_null('system_id')
+    assert not profile.is_unique('system_id')
+    assert (profile['system_id'].dtype, profile['system_id'].null_count) == ('int64', 0)
+    assert (profile['system_id'].min, profile['system_id'].max) == (1, 2)
+    assert profile['name'].min is None and profile['value'].max is None
+
+    submission.data_tables['tbl_samples'] = submission.data_tables['tbl_samples'].drop_duplicates('system_id')
+    assert submission.get_profile('tbl_samples') is not profile
+    assert submission.get_profile('tbl_samples').is_unique('system_id')
+
+    profile = submission.get_profile('tbl_samples')
+    submission.data_tables['tbl_samples'].loc[:, 'value'] = 1
+    submission.invalidate_profile('tbl_samples')
+    assert not submission.get_profile('tbl_samples').any_null('value')
+
+    profile = submission.get_profile('tbl_samples')
+    submission.data_tables['tbl_samples']['added'] = None
+    assert submission.get_profile('tbl_samples').all_null('added')
+
+    profile = submission.get_profile('tbl_samples')
+    data_table: pd.DataFrame = submission.data_tables['tbl_samples']
+    data_table['system_id'] = data_table['system_id'].astype('Int32')
+    assert submission.get_profile('tbl_samples') is not profile
+    assert submission.get_profile('tbl_samples')['system_id'].dtype == 'Int32'
+
+
+def test_submission_can_be_pickled_with_lock():
+    submission: Submission = Submission({'tbl_samples': pd.DataFrame({'system_id': [1, 2]})}, None)
+    submission.get_profile('tbl_samples')
+
+    restored: Submission = pickle.loads(pickle.dumps(submission))
+
+    assert restored.lock is not submission.lock
+    assert restored.get_profile('tbl_samples').row_count == 2
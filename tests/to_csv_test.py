@@ -1,9 +1,12 @@
+import gzip
+
 from importer.uploader.xml_to_csv import (
     Column,
     Record,
     RecordValue,
     Table,
     xml_to_columns,
+    xml_to_csv,
     xml_to_record_values,
     xml_to_records,
     xml_to_tables,
@@ -187,3 +190,17 @@ def test_xml_to_records_by_file():
         )
         in record_values
     )
+
+
+def test_xml_to_csv_reads_compressed_file(tmp_path):
+    xml_filename: str = str(tmp_path / "submission.xml.gz")
+    with gzip.open(xml_filename, "wt", encoding="utf-8") as fp:
+        fp.write(XML_SNIPPET)
+
+    assert list(xml_to_tables(xml_filename)) == list(xml_to_tables(XML_SNIPPET))
+    assert list(xml_to_record_values(xml_filename)) == list(xml_to_record_values(XML_SNIPPET))
+
+    csv_filename: str = xml_to_csv(xml_filename, str(tmp_path), xml_to_records, Record)
+    assert csv_filename == str(tmp_path / "submission_records.csv")
+    with open(csv_filename, encoding="utf-8") as fp:
+        assert len(fp.readlines()) == len(list(xml_to_records(XML_SNIPPET))) + 1
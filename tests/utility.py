@@ -8,6 +8,7 @@ import pandas as pd
 
 from importer.configuration.inject import ConfigValue
 from importer.metadata import Metadata
+from importer.policies import IfForeignKeyValueIsMissingAddIdentityMappingToForeignKeyTable
 from importer.submission import Submission
 from importer.utility import create_db_uri
 
@@ -206,3 +207,30 @@ def load_test_submission(excel_filename: str, test_sites: list[int], filename: s
         with open(pickled_filename, "rb") as fp:
             submission: dict[str, pd.DataFrame] = pickle.load(fp)
     return submission
+
+
+def create_offline_metadata(ignore_columns: list[str] = None) -> Metadata:
+    """Returns metadata read from the SEAD table and column dumps in tests/test_data (no database needed)."""
+    metadata: Metadata = Metadata("offline", ignore_columns=ignore_columns or ["date_updated"])
+    sead_tables: pd.DataFrame = pd.read_json("tests/test_data/sead_tables.json")
+    sead_columns: pd.DataFrame = pd.read_json("tests/test_data/sead_columns.json")
+    lookups: pd.DataFrame = (
+        sead_columns[sead_columns.is_fk & ~sead_columns.fk_table_name.isin(sead_tables.table_name)]
+        .drop_duplicates("fk_table_name")
+        .rename(columns={"fk_column_name": "pk_name", "class_name": "java_class"})
+        .assign(table_name=lambda x: x.fk_table_name, excel_sheet=lambda x: x.fk_table_name)
+        .assign(is_lookup=True, is_unknown=False)
+    )
+    metadata.sead_tables = pd.concat([sead_tables, lookups[sead_tables.columns]], ignore_index=True).set_index(
+        "table_name", drop=False
+    )
+    metadata.sead_columns = sead_columns
+    return metadata
+
+
+def load_offline_submission(source: str = "tests/test_data/building_dendro_reduced.xlsx") -> Submission:
+    """Returns the reduced test submission using offline metadata. Of the policies, only identity mappings for
+    referenced lookup tables (not in the metadata dump) are added."""
+    submission: Submission = Submission.load(metadata=create_offline_metadata(), source=source, apply_policies=False)
+    IfForeignKeyValueIsMissingAddIdentityMappingToForeignKeyTable(submission.metadata, submission).update()
+    return submission
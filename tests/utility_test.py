@@ -1,8 +1,12 @@
+import base64
+import fnmatch
+import gzip
 import io
 from typing import Any
 from unittest.mock import patch
 
 import pandas as pd
+import pytest
 
 from importer import utility
 
@@ -30,6 +34,44 @@ def test_tidy_xml_returns_a_tidy_xml():
     assert tidy_path == "/tmp/test_tidy.xml"
 
 
+def test_tidy_xml_reindents_while_streaming(tmp_path):
+    xml_text = """<?xml version='1.0' encoding='UTF-8'?>
+     <main a="x &quot;y&quot; &#10;">  <sub> <name>Ana &amp; Bo</name>
+    <detail/> <type>smart</type> </sub> </main> """
+    path = tmp_path / "test.xml.gz"
+    with utility.open_compressed(str(path), "w") as outstream:
+        outstream.write(xml_text)
+
+    tidy_path = utility.tidy_xml(str(path))
+
+    assert tidy_path == str(tmp_path / "test_tidy.xml.gz")
+    assert not path.exists()
+    with utility.open_compressed(tidy_path, "r") as instream:
+        assert instream.read().splitlines() == [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<main a="x &quot;y&quot; &#10;">',
+            '  <sub>',
+            '    <name>Ana &amp; Bo</name>',
+            '    <detail/>',
+            '    <type>smart</type>',
+            '  </sub>',
+            '</main>',
+        ]
+
+
+def test_tidy_xml_reproduces_dispatched_xml(tmp_path):
+    """Dispatcher output is already indented, tidying it only rewrites the declaration"""
+    path = tmp_path / "test.xml"
+    with open("tests/test_data/building_dendro_reduced_dispatched.xml", "r", encoding="utf-8") as fp:
+        xml_text: str = fp.read()
+    path.write_text(xml_text, encoding="utf-8")
+
+    tidy_path = utility.tidy_xml(str(path), remove_source=False)
+
+    with open(tidy_path, "r", encoding="utf-8") as fp:
+        assert fp.read().split("\n", 1)[1] == xml_text.split("\n", 1)[1]
+
+
 def test_recursive_delete():
 
     d: dict[str, Any] = {'a': 1}
@@ -200,3 +242,54 @@ def test_load_sead_columns():
     with patch('importer.utility.load_sead_data', return_value=mock_data):
         result = utility.load_sead_columns(db_uri, ignore_columns)
         assert result.equals(mock_data)
+
+
+def test_column_matcher_agrees_with_fnmatch():
+    patterns = ["date_updated", "*_uuid", "(*", "col?"]
+    names = ["date_updated", "site_uuid", "(lookup)", "col1", "col12", "site_id", "uuid", "date_updated_x"]
+    matcher = utility.column_matcher(patterns)
+
+    assert matcher is utility.column_matcher(list(patterns))
+    assert matcher.filter(names) == [x for x in names if any(fnmatch.fnmatch(x, p) for p in patterns)]
+    assert matcher.exclude(names) == ["col12", "site_id", "uuid", "date_updated_x"]
+    assert set(matcher.memo) == set(names)
+    assert not utility.column_matcher([]).match("date_updated")
+
+
+@pytest.mark.parametrize("extension", ["", ".gz", ".zst"])
+def test_open_compressed_streams_text_through_compression(tmp_path, extension: str):
+    if extension == ".zst":
+        pytest.importorskip("zstandard")
+    filename: str = str(tmp_path / f"test.xml{extension}")
+    with utility.open_compressed(filename, "w") as outstream:
+        outstream.write("<root>å</root>\n")
+
+    assert utility.is_xml_filename(filename)
+    with utility.open_compressed(filename, "r") as instream:
+        assert instream.read() == "<root>å</root>\n"
+    if extension == ".gz":
+        assert gzip.decompress((tmp_path / "test.xml.gz").read_bytes()) == "<root>å</root>\n".encode("utf-8")
+
+
+def test_path_add_suffix_keeps_compression_extension():
+    assert utility.path_add_suffix("/tmp/test.xml", "_tidy") == "/tmp/test_tidy.xml"
+    assert utility.path_add_suffix("/tmp/test.xml.gz", "_tidy") == "/tmp/test_tidy.xml.gz"
+    assert utility.path_add_suffix("/tmp/test.xml.zst", "_findings", ".ndjson") == "/tmp/test_findings.ndjson"
+
+
+def test_compress_and_encode_compresses_file_content(tmp_path):
+    path = tmp_path / "test.xml"
+    path.write_text("<root>" + "x" * 10000 + "</root>", encoding="utf-8")
+
+    utility.compress_and_encode(str(path))
+
+    compressed: bytes = (tmp_path / "test.xml.gz").read_bytes()
+    assert gzip.decompress(compressed) == path.read_bytes()
+    assert base64.b64decode((tmp_path / "test.xml.gz.uue").read_bytes()) == compressed
+
+
+def test_available_compressions_excludes_zstd_if_zstandard_is_missing():
+    with patch("importlib.util.find_spec", return_value=None):
+        assert utility.available_compressions() == ["gzip"]
+    with patch("importlib.util.find_spec", return_value=object()):
+        assert utility.available_compressions() == ["gzip", "zstd"]
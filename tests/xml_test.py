@@ -1,19 +1,44 @@
-from unittest.mock import Mock
+import gzip
+import io
+from unittest.mock import MagicMock, Mock
 
 import pandas as pd
+import pytest
 
-from importer.dispatchers.to_xml import XmlProcessor
+from importer.dispatchers.serializers import Serializers
+from importer.dispatchers.to_xml import ColumnPlan, TablePlan, XmlProcessor
+from importer.metadata import Column, Metadata, Table
+from importer.submission import Submission
+from importer.utility import escape_attribute, open_compressed
+from tests.utility import load_offline_submission
 
 # pylint: disable=unused-argument,redefined-outer-name
 
+GOLDEN_XML_FILENAME: str = "tests/test_data/building_dendro_reduced_dispatched.xml"
+
 
 def test_emit():
     outstream = Mock()
     processor = XmlProcessor(outstream)
     processor.emit('test', 2)
+    processor.flush()
     outstream.write.assert_called_once_with('    test\n')
 
 
+def test_emit_writes_in_blocks():
+    outstream = Mock()
+    processor = XmlProcessor(outstream, buffer_size=12)
+    for i in range(5):
+        processor.emit(f'line{i}', 1)
+    processor.flush()
+
+    assert [x.args[0] for x in outstream.write.call_args_list] == [
+        '  line0\n  line1\n',
+        '  line2\n  line3\n',
+        '  line4\n',
+    ]
+
+
 # def test_camel_case_name():
 #     outstream = Mock()
 #     processor = XmlProcessor(outstream)
@@ -49,3 +74,110 @@ def test_read_xml():
 #     processor.process_data(metadata, submission, table_names, max_rows)
 
 #     # Add assertions here to verify the expected behavior
+
+
+def test_dispatch_output_is_unchanged():
+    """Output must be identical to that of the original row-by-row dispatcher"""
+    submission: Submission = load_offline_submission()
+    outstream = io.StringIO()
+
+    XmlProcessor(outstream).dispatch(submission.metadata, submission)
+
+    with open(GOLDEN_XML_FILENAME, "r", encoding="utf-8") as fp:
+        assert outstream.getvalue() == fp.read()
+
+
+def test_dispatch_streams_compressed_output(tmp_path):
+    submission: Submission = load_offline_submission()
+    filename: str = str(tmp_path / "submission.xml.gz")
+
+    with open_compressed(filename, "w") as outstream:
+        XmlProcessor(outstream).dispatch(submission.metadata, submission)
+
+    with open(GOLDEN_XML_FILENAME, "rb") as fp:
+        assert gzip.decompress((tmp_path / "submission.xml.gz").read_bytes()) == fp.read()
+
+
+@pytest.mark.parametrize("serializer", ["string", "bytes", "lxml"])
+def test_dispatch_output_is_independent_of_serializer(tmp_path, serializer: str):
+    submission: Submission = load_offline_submission()
+    filename: str = str(tmp_path / "submission.xml")
+
+    with open(filename, "w", encoding="utf-8") as outstream:
+        processor = XmlProcessor(outstream, serializer=serializer)
+        assert processor.writer.key == serializer
+        processor.dispatch(submission.metadata, submission)
+
+    with open(GOLDEN_XML_FILENAME, "rb") as fp:
+        assert (tmp_path / "submission.xml").read_bytes() == fp.read()
+
+
+@pytest.mark.parametrize("serializer", ["string", "bytes", "lxml"])
+def test_serializer_escapes_values(serializer: str):
+    values: list[str] = ["plain", "a<b>&c", 'say "hi"', "cr\r\nlf", "bell\x07 nul\x00", "\ue000", "\ufffe"]
+    escaped: list[str] = Serializers.get(serializer)(io.StringIO()).escape_values(values)
+
+    assert escaped == [
+        "plain",
+        "a&lt;b&gt;&amp;c",
+        'say "hi"',
+        "cr&#13;\nlf",
+        "bell\ufffd nul\ufffd",
+        "\ue000",
+        "\ufffd",
+    ]
+    assert escape_attribute('a "b"\t<c>\n') == "a &quot;b&quot;&#9;&lt;c&gt;&#10;"
+
+
+def test_compiled_plan_resolves_fk_public_id_by_system_id():
+    fk_table = Table(
+        table_name="tbl_parents", pk_name="parent_id", java_class="TblParents", excel_sheet="", is_lookup=False
+    )
+    column = MagicMock(spec=Column, table_name="tbl_children", column_name="parent_id", class_name="TblParents")
+    column.camel_case_column_name = "parentId"
+    column.is_fk = True
+    column.is_pk = False
+    column.is_nullable = True
+    table = Table(
+        table_name="tbl_children", pk_name="child_id", java_class="TblChildren", excel_sheet="", is_lookup=False
+    )
+    table.columns = {"parent_id": column}
+    metadata = MagicMock(spec=Metadata)
+    metadata.__getitem__.return_value = fk_table
+    submission = MagicMock(spec=Submission)
+    submission.data_tables = {
+        "tbl_parents": pd.DataFrame({"system_id": [1.0, 2.0, 3.0, 3.0], "parent_id": [10, None, 30, 31]})
+    }
+    data = pd.DataFrame({"parent_id": [1, 2, 3, 4, None]})
+
+    plan: TablePlan = XmlProcessor(io.StringIO()).compile_plan(metadata, submission, table, data)
+    fragments = plan.columns[0].render(data, system_ids=None)
+
+    assert "".join(fragments).splitlines() == [
+        '      <parentId class="com.sead.database.TblParents" id="1" clonedId="10"/>',
+        '      <parentId class="com.sead.database.TblParents" id="2"/>',
+        '      <parentId class="com.sead.database.TblParents" id="3" clonedId="3"/>',
+        '      <parentId class="com.sead.database.TblParents" id="4" clonedId="4"/>',
+        '      <parentId class="com.sead.database.TblParents" id="NULL"/>',
+    ]
+
+
+def test_render_formats_and_escapes_values_column_wise():
+    data = pd.DataFrame(
+        {
+            "value": pd.Series(["a<b", None, "x & y", 1.5, pd.Timestamp("2020-01-01")], dtype=object),
+            "float": [0.1, None, 1e20, 2.0, -1.5],
+            "int": pd.array([1, None, 3, 4, 5], dtype="Int64"),
+        }
+    )
+
+    fragments: dict[str, list[str]] = {}
+    for name in data.columns:
+        column = MagicMock(spec=Column, column_name=name, class_name="C", is_pk=False, is_fk=False)
+        fragments[name] = ColumnPlan(column=column, tag="v").render(data, system_ids=None).tolist()
+
+    assert fragments["value"] == [
+        f'      <v class="C">{x}</v>\n' for x in ["a&lt;b", "NULL", "x &amp; y", "1.5", "2020-01-01 00:00:00"]
+    ]
+    assert fragments["float"] == [f'      <v class="C">{x}</v>\n' for x in ["0.1", "NULL", "1e+20", "2.0", "-1.5"]]
+    assert fragments["int"] == [f'      <v class="C">{x}</v>\n' for x in ["1", "NULL", "3", "4", "5"]]